@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+    bench
+    ~~~~~
+
+    Reproducible benchmarks for the classifier.
+
+    Run ``python -m bench --help`` for usage.
+
+    :license: MIT
+"""
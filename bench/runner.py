@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+    bench.runner
+    ~~~~~~~~~~~~
+
+    Measures the throughput of the classifier and of each of its stages,
+    and compares the results against a saved baseline.
+
+    :license: MIT
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import sys
+from timeit import default_timer
+
+from chandas.classify import Classifier
+from chandas.wrappers import Block
+
+from .synthetic import random_catalog, random_corpus
+
+
+def best_time(func, repeat):
+    """Return the fastest of `repeat` calls to `func`, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = default_timer()
+        func()
+        times.append(default_timer() - start)
+    return min(times)
+
+
+def run(classifier, corpus, repeat=3):
+    """Time the classifier on some corpus.
+
+    :param classifier: a `Classifier`
+    :param corpus: a list of raw verses
+    :param repeat: how many times to run each stage. The fastest run
+                   is reported.
+    :rtype: a dict of results
+    """
+    scans = [''.join(Block(raw).scan) for raw in corpus]
+    misses = [s for s in scans if classifier.match_vrtta(s) is None]
+    padyas = [classifier.classify(raw) for raw in corpus]
+    matched = [(raw, p) for raw, p in zip(corpus, padyas) if p]
+
+    stages = [
+        ('scan', len(corpus),
+         lambda: [Block(raw).scan for raw in corpus]),
+        ('vrtta', len(scans),
+         lambda: [classifier.match_vrtta(s) for s in scans]),
+        ('jati', len(misses),
+         lambda: [classifier.match_jati(s) for s in misses]),
+        ('split', len(matched),
+         lambda: [classifier.split_into_padas(raw, p) for raw, p in matched]),
+        ('classify', len(corpus),
+         lambda: [classifier.classify(raw) for raw in corpus]),
+    ]
+
+    results = {
+        'verses': len(corpus),
+        'matched': len(matched),
+        'stages': {},
+    }
+    for name, count, func in stages:
+        seconds = best_time(func, repeat)
+        results['stages'][name] = {
+            'count': count,
+            'seconds': seconds,
+            'per_item': seconds / count if count else 0.0,
+        }
+    classify_seconds = results['stages']['classify']['seconds']
+    results['verses_per_second'] = len(corpus) / classify_seconds
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return the stages that are slower than in some baseline.
+
+    :param results: the output of `run`
+    :param baseline: the output of an earlier `run`
+    :param threshold: the allowed slowdown, as a fraction of the
+                      baseline time per item
+    :rtype: a list of ``(stage, baseline, current)`` tuples
+    """
+    regressions = []
+    for name, stage in sorted(results['stages'].items()):
+        try:
+            old = baseline['stages'][name]['per_item']
+        except KeyError:
+            continue
+        new = stage['per_item']
+        if old and new > old * (1 + threshold):
+            regressions.append((name, old, new))
+    return regressions
+
+
+def report(results, out=sys.stdout):
+    print('%d verses, %d matched' % (results['verses'], results['matched']),
+          file=out)
+    print('%.0f verses/s' % results['verses_per_second'], file=out)
+    for name, stage in sorted(results['stages'].items()):
+        print('  %-10s %8d items %10.3f ms %10.2f us/item' % (
+            name, stage['count'], stage['seconds'] * 1000,
+            stage['per_item'] * 1e6), file=out)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog='python -m bench',
+                                     description=__doc__.strip())
+    parser.add_argument('--catalog', default='data/data.json',
+                        help='JSON catalog to use (default: %(default)s)')
+    parser.add_argument('--meters', type=int,
+                        help='use a synthetic catalog with this many meters')
+    parser.add_argument('--verses', type=int, default=2000,
+                        help='number of synthetic verses '
+                             '(default: %(default)s)')
+    parser.add_argument('--miss-rate', type=float, default=0.2,
+                        help='fraction of random verses '
+                             '(default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per stage; the best is kept '
+                             '(default: %(default)s)')
+    parser.add_argument('--save', metavar='PATH',
+                        help='save the results as a JSON baseline')
+    parser.add_argument('--baseline', metavar='PATH',
+                        help='compare the results against a JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='allowed slowdown per stage '
+                             '(default: %(default)s)')
+    args = parser.parse_args(args)
+
+    if args.meters:
+        catalog = random_catalog(args.meters, seed=args.seed)
+    else:
+        with open(args.catalog) as f:
+            catalog = json.load(f)
+    classifier = Classifier.from_data(catalog)
+    corpus = random_corpus(classifier, args.verses, seed=args.seed,
+                           miss_rate=args.miss_rate)
+
+    results = run(classifier, corpus, repeat=args.repeat)
+    report(results)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, old, new in regressions:
+            print('REGRESSION %s: %.2f us/item -> %.2f us/item (+%.0f%%)' % (
+                name, old * 1e6, new * 1e6, (new / old - 1) * 100))
+        if regressions:
+            return 1
+    return 0
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+    bench.synthetic
+    ~~~~~~~~~~~~~~~
+
+    Generators for synthetic catalogs and corpora.
+
+    :license: MIT
+"""
+
+import random
+
+from chandas.enums import Weights
+from chandas.padyas import Jati
+
+
+#: Raw text for each syllable weight, as in the tests.
+SYLLABLES = {
+    Weights.GURU: 'kA',
+    Weights.LAGHU: 'ka',
+}
+
+
+def scan2raw(scan):
+    """Return some SLP1 text whose scan is `scan`."""
+    return ''.join(SYLLABLES[w] for w in scan)
+
+
+def random_catalog(size, seed=0, wildcard_rate=0.02, jati_rate=0.05):
+    """Return a random catalog in the JSON format of ``data/data.json``.
+
+    :param size: the number of meters
+    :param seed: the random seed
+    :param wildcard_rate: the chance that a syllable is ``'.'``
+    :param jati_rate: the chance that a meter is a jāti
+    """
+    rnd = random.Random(seed)
+    weights = [Weights.GURU, Weights.LAGHU]
+
+    def pada():
+        length = rnd.randint(8, 21)
+        return ''.join(Weights.EITHER if rnd.random() < wildcard_rate
+                       else rnd.choice(weights) for _ in range(length))
+
+    catalog = []
+    for i in range(size):
+        name = 'synthetic-%d' % i
+        if rnd.random() < jati_rate:
+            counts = [rnd.randint(10, 20) for _ in range(4)]
+            catalog.append({'name': name, 'pattern': [], 'counts': counts})
+        else:
+            num_padas = rnd.choice([1, 1, 1, 2, 4])
+            pattern = [pada() for _ in range(num_padas)]
+            catalog.append({'name': name, 'pattern': pattern})
+    return catalog
+
+
+def random_scan(padya, rnd):
+    """Return the pāda scans of a random verse in some meter.
+
+    :param padya: a `Padya`
+    :param rnd: a `random.Random`
+    """
+    if isinstance(padya, Jati):
+        padas = []
+        for count in padya.counts:
+            scan = ''
+            total = 0
+            while total < count:
+                if count - total == 1:
+                    weight = Weights.LAGHU
+                else:
+                    weight = rnd.choice([Weights.GURU, Weights.LAGHU])
+                scan += weight
+                total += 1 if weight == Weights.LAGHU else 2
+            padas.append(scan)
+        return padas
+
+    return [''.join(rnd.choice([Weights.GURU, Weights.LAGHU])
+                    if w == Weights.EITHER else w for w in scan)
+            for scan in padya.scans]
+
+
+def random_corpus(classifier, size, seed=0, miss_rate=0.2):
+    """Return a list of random verses for some classifier.
+
+    Most verses conform to a random meter in the classifier's catalog.
+    The rest have random scans and usually match nothing.
+
+    :param classifier: a `Classifier`
+    :param size: the number of verses
+    :param seed: the random seed
+    :param miss_rate: the chance that a verse has a random scan
+    """
+    rnd = random.Random(seed)
+    meters = classifier.vrttas + classifier.jatis
+    corpus = []
+    for _ in range(size):
+        if not meters or rnd.random() < miss_rate:
+            padas = [''.join(rnd.choice([Weights.GURU, Weights.LAGHU])
+                             for _ in range(rnd.randint(8, 21)))
+                     for _ in range(4)]
+        else:
+            padas = random_scan(rnd.choice(meters), rnd)
+        corpus.append('\n'.join(scan2raw(x) for x in padas))
+    return corpus
@@ -1 +1 @@
-from classify import Classifier
+from .classify import Classifier
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+    chandas.aio
+    ~~~~~~~~~~~
+
+    An asyncio interface to the classifier.
+
+    This module needs Python 3.7 or later.
+
+    :license: MIT
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+from . import parallel
+from .wrappers import Block
+
+
+class AsyncClassifier(object):
+
+    """Wraps a `Classifier` so that it can be used from an event loop.
+
+    Inputs are classified in batches on an executor, so the event loop
+    is never blocked for more than it takes to hand a batch over. At
+    most `max_pending` batches are in flight at a time, and input is
+    read only as fast as those batches finish.
+
+    :param classifier: a `Classifier`
+    :param executor: a thread executor, or ``None`` for the event loop's
+                     default executor. Use `with_processes` for a
+                     process executor.
+    :param max_pending: the most batches in flight at a time
+    :param batch_size: the number of inputs in each batch
+    """
+
+    def __init__(self, classifier, executor=None, max_pending=4,
+                 batch_size=256):
+        #: The wrapped `Classifier`.
+        self.classifier = classifier
+
+        #: The executor that batches run on.
+        self.executor = executor
+
+        #: The most batches in flight at a time.
+        self.max_pending = max_pending
+
+        #: The number of inputs in each batch.
+        self.batch_size = batch_size
+
+        self._meters = parallel.meters(classifier)
+        self._work = functools.partial(parallel._classify_chunk, classifier,
+                                       parallel._make_meter_ids(classifier))
+        self._owns_executor = False
+
+    @classmethod
+    def with_processes(self, classifier, jobs=None, **kw):
+        """Create an `AsyncClassifier` that runs on worker processes.
+
+        Each worker gets its own copy of `classifier` when it starts,
+        so batches don't need to send it again. The executor is shut
+        down by `close`.
+
+        :param classifier: a `Classifier`
+        :param jobs: the number of worker processes. By default, this
+                     is the number of CPUs.
+        :param kw: passed to `AsyncClassifier`
+        """
+        executor = ProcessPoolExecutor(jobs, initializer=parallel._init_worker,
+                                       initargs=(classifier,))
+        returned = self(classifier, executor, **kw)
+        returned._work = parallel._work
+        returned._owns_executor = True
+        return returned
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Shut down the executor, if it was made by `with_processes`."""
+        if self._owns_executor:
+            self.executor.shutdown(wait=False)
+
+    async def classify(self, raw):
+        """Identify the meter of some input, as `Classifier.classify`.
+
+        :param raw: an input string
+        :rtype: a `Padya`
+        """
+        return (await self.classify_many([raw]))[0]
+
+    async def classify_many(self, data):
+        """Identify the meter of many inputs, as
+        `Classifier.classify_many`.
+
+        :param data: anything accepted by `classify_corpus`
+        :rtype: a list of `Padya` or ``None``, in input order
+        """
+        returned = {}
+        async for i, padya in self.classify_corpus(data):
+            returned[i] = padya
+        return [returned[i] for i in range(len(returned))]
+
+    async def classify_corpus(self, data):
+        """Classify every block in some input, as results come in.
+
+        Results are yielded as soon as their batch is done, which may
+        not be in input order. If the iteration is cancelled or closed
+        early, batches that haven't started are cancelled.
+
+        Sync input is read one batch at a time on the event loop's
+        default executor, so reading a file doesn't block the loop.
+
+        :param data: a string, a file object, or a sync or async
+                     iterable of raw blocks or `Block` objects
+        :rtype: an async iterator over pairs of a block index and a
+                `Padya` or ``None``
+        """
+        loop = asyncio.get_event_loop()
+        pending = set()
+        try:
+            async for chunk in self._iter_chunks(data):
+                while len(pending) >= self.max_pending:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED)
+                    for item in self._iter_done(done):
+                        yield item
+                pending.add(loop.run_in_executor(self.executor, self._work,
+                                                 chunk))
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                for item in self._iter_done(done):
+                    yield item
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def _iter_chunks(self, data):
+        """Iterate over `data` in chunks, as `parallel._iter_chunks`."""
+        if not hasattr(data, '__aiter__'):
+            loop = asyncio.get_event_loop()
+            chunks = parallel._iter_chunks(parallel._iter_raw(data),
+                                           self.batch_size)
+            while True:
+                chunk = await loop.run_in_executor(None, next, chunks, None)
+                if chunk is None:
+                    return
+                yield chunk
+
+        start = 0
+        chunk = []
+        async for datum in data:
+            chunk.append(datum.raw if isinstance(datum, Block) else datum)
+            if len(chunk) == self.batch_size:
+                yield start, chunk
+                start += len(chunk)
+                chunk = []
+        if chunk:
+            yield start, chunk
+
+    def _iter_done(self, done):
+        """Yield the results of some finished batches."""
+        meters = self._meters
+        for future in done:
+            start, meter_ids = future.result()
+            for i, meter_id in enumerate(meter_ids, start):
+                yield i, None if meter_id is None else meters[meter_id]
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+    chandas.approximate
+    ~~~~~~~~~~~~~~~~~~~
+
+    Approximate matching of scans against many patterns at once.
+
+    :license: MIT
+"""
+
+import binascii
+
+from .enums import Weights
+
+
+class ApproximateMatcher(object):
+
+    """Finds the patterns within some edit distance of a scan.
+
+    Each pattern is a string over ``'L'``, ``'G'`` and ``'.'``, as in
+    `PatternIndex`. The distance counts syllable substitutions,
+    insertions and deletions.
+
+    This is the bit-parallel algorithm of Wu and Manber, run over every
+    pattern at once: all of the patterns are packed side by side into
+    one integer, where the bit for position `i` of a pattern is set if
+    the scan so far can be aligned with the first `i` syllables of that
+    pattern. Each syllable of the scan then costs a few shifts and ANDs
+    per allowed error, however many patterns there are.
+    """
+
+    def __init__(self, patterns):
+        #: The patterns, in priority order.
+        self.patterns = list(patterns)
+
+        # Pattern `i` takes up the bits from `starts[i]` (no syllables
+        # matched) to `starts[i] + len(pattern)` (all of them matched).
+        starts = []
+        offset = 0
+        for pattern in self.patterns:
+            starts.append(offset)
+            offset += len(pattern) + 1
+        self._all = (1 << offset) - 1
+
+        # The bits of each mask are collected first and turned into an
+        # integer once, since setting them one at a time would copy the
+        # whole integer for each bit.
+        finals = []
+        weight_bits = {Weights.LAGHU: [], Weights.GURU: []}
+        by_length = {}
+        self._final_index = {}
+        for i, (pattern, start) in enumerate(zip(self.patterns, starts)):
+            final = start + len(pattern)
+            finals.append(final)
+            self._final_index[final] = i
+            for j, weight in enumerate(pattern, start + 1):
+                for key, bits in weight_bits.items():
+                    if weight in (key, Weights.EITHER):
+                        bits.append(j)
+            by_length.setdefault(len(pattern), []).append(start)
+
+        self._start = _to_int(starts, offset)
+        self._final = _to_int(finals, offset)
+        self._masks = dict((key, _to_int(bits, offset))
+                           for key, bits in weight_bits.items())
+        self._by_length = dict((length, _to_int(bits, offset))
+                               for length, bits in by_length.items())
+        self._not_start = self._all & ~self._start
+
+    def _start_mask(self, length, max_errors):
+        """Return the start bits of the patterns whose length is close
+        enough to `length` to be matched."""
+        mask = 0
+        for n in range(length - max_errors, length + max_errors + 1):
+            mask |= self._by_length.get(n, 0)
+        return mask
+
+    def distances(self, scan, max_errors):
+        """Return the edit distance from `scan` to each close pattern.
+
+        :param scan: a string of syllable weights
+        :param max_errors: the largest distance to report
+        :rtype: a dict that maps pattern indices to distances
+        """
+        masks = self._masks
+        not_start = self._not_start
+
+        # `states[k]` holds the alignments with at most `k` errors.
+        states = [self._start_mask(len(scan), max_errors)]
+        for k in range(max_errors):
+            previous = states[-1]
+            states.append(previous | ((previous << 1) & not_start))
+
+        for weight in scan:
+            mask = masks.get(weight, 0)
+            old = states
+            states = [(old[0] << 1) & mask]
+            for k in range(1, max_errors + 1):
+                states.append(((old[k] << 1) & mask) |
+                              old[k - 1] |
+                              ((old[k - 1] << 1) & not_start) |
+                              ((states[k - 1] << 1) & not_start))
+
+        found = {}
+        seen = 0
+        for k, state in enumerate(states):
+            finals = state & self._final & ~seen
+            seen |= finals
+            while finals:
+                low = finals & -finals
+                found[self._final_index[low.bit_length() - 1]] = k
+                finals ^= low
+        return found
+
+    def search(self, scan):
+        """Find every exact occurrence of every pattern in `scan`.
+
+        This is the Shift-And algorithm, with a new alignment started at
+        every syllable, so it runs in one pass over `scan`.
+
+        :param scan: a string of syllable weights
+        :rtype: an iterator over ``(end, index)`` pairs, where `end` is
+                the offset after the last syllable of the occurrence.
+                Pairs are ordered by `end` and then by priority.
+        """
+        masks = self._masks
+        start = self._start
+        final = self._final
+        final_index = self._final_index
+        state = 0
+        for end, weight in enumerate(scan, 1):
+            state = ((state | start) << 1) & masks.get(weight, 0)
+            found = state & final
+            while found:
+                low = found & -found
+                yield end, final_index[low.bit_length() - 1]
+                found ^= low
+
+    def match(self, scan, max_errors):
+        """Return the patterns within some edit distance of `scan`.
+
+        :param scan: a string of syllable weights
+        :param max_errors: the largest distance to report
+        :rtype: a list of ``(index, distance, edits)`` tuples, ordered
+                by distance and then by priority. See `align` for the
+                format of `edits`.
+        """
+        found = self.distances(scan, max_errors)
+        returned = []
+        for index, distance in sorted(found.items(),
+                                      key=lambda x: (x[1], x[0])):
+            edits = align(scan, self.patterns[index], distance)
+            returned.append((index, distance, edits))
+        return returned
+
+
+def align(scan, pattern, max_errors=None):
+    """Return a cheapest list of edits that turns `pattern` into `scan`.
+
+    Each edit is a tuple ``(kind, scan_index, pattern_index)``, where
+    `kind` is one of:
+
+    - ``'substitute'``: the syllable at `scan_index` has the wrong
+      weight for the syllable at `pattern_index`
+    - ``'insert'``: the syllable at `scan_index` is extra
+    - ``'delete'``: the syllable at `pattern_index` is missing, and
+      would come before `scan_index`
+
+    :param scan: a string of syllable weights
+    :param pattern: a pattern, as in `ApproximateMatcher`
+    :param max_errors: if known, an upper bound on the distance. Only
+                       alignments within this bound are searched, which
+                       makes the search linear in the input length.
+    """
+    n = len(scan)
+    m = len(pattern)
+    band = max(n, m) if max_errors is None else max_errors
+    infinity = n + m + 1
+
+    # `costs[i][j]` is the distance between `scan[:i]` and `pattern[:j]`,
+    # or `infinity` if `i` and `j` are more than `band` apart.
+    costs = [[infinity] * (m + 1) for _ in range(n + 1)]
+    for j in range(min(m, band) + 1):
+        costs[0][j] = j
+    for i in range(1, n + 1):
+        row = costs[i]
+        previous = costs[i - 1]
+        if i <= band:
+            row[0] = i
+        for j in range(max(1, i - band), min(m, i + band) + 1):
+            same = pattern[j - 1] in (scan[i - 1], Weights.EITHER)
+            row[j] = min(previous[j - 1] + (0 if same else 1),
+                         previous[j] + 1,
+                         row[j - 1] + 1)
+
+    edits = []
+    i, j = n, m
+    while i or j:
+        cost = costs[i][j]
+        if i and j:
+            same = pattern[j - 1] in (scan[i - 1], Weights.EITHER)
+            if cost == costs[i - 1][j - 1] + (0 if same else 1):
+                if not same:
+                    edits.append(('substitute', i - 1, j - 1))
+                i -= 1
+                j -= 1
+                continue
+        if i and cost == costs[i - 1][j] + 1:
+            edits.append(('insert', i - 1, j))
+            i -= 1
+        else:
+            edits.append(('delete', i, j - 1))
+            j -= 1
+    edits.reverse()
+    return edits
+
+
+def _to_int(bits, size):
+    """Return an integer with the given bits set.
+
+    :param bits: the indices of the bits to set
+    :param size: the number of bits in the integer, at most
+    """
+    data = bytearray((size + 7) // 8)
+    for i in bits:
+        data[-1 - (i >> 3)] |= 1 << (i & 7)
+    if not data:
+        return 0
+    return int(binascii.hexlify(data), 16)
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+    chandas.automaton
+    ~~~~~~~~~~~~~~~~~
+
+    A deterministic automaton for matching many syllable patterns at once.
+
+    :license: MIT
+"""
+
+from .enums import Weights
+
+
+class Automaton(object):
+
+    """Matches a scan against a list of syllable patterns in one pass.
+
+    Each pattern is a string over ``'L'``, ``'G'`` and ``'.'``, where
+    ``'.'`` accepts either weight. The patterns are merged into a single
+    deterministic automaton whose states are the sets of patterns that
+    are still alive after some prefix of the input. These sets are
+    stored as bitmasks.
+
+    The automaton is built lazily: a transition is added the first time
+    a scan needs it, so building is cheap even when wildcards would make
+    the full automaton explode. Each transition reads up to `STRIDE`
+    syllables at once. After `MAX_TRANSITIONS` transitions, new ones
+    are still followed but no longer kept, so unusual input can't make
+    the automaton grow without bound.
+
+    Patterns are bucketed by length, and each length has its own start
+    state. A scan whose length matches no pattern is rejected at once,
+    and otherwise only patterns of the right length are ever considered.
+    Matching walks one transition per `STRIDE` syllables, so once the
+    transitions it needs exist, its cost does not depend on the number
+    of patterns.
+    """
+
+    #: The most syllables read by one transition.
+    STRIDE = 16
+
+    #: The most transitions to keep.
+    MAX_TRANSITIONS = 1 << 16
+
+    def __init__(self, patterns):
+        #: The patterns, in priority order.
+        self.patterns = list(patterns)
+
+        #: `starts[n]` is the start state for scans of length `n`.
+        self.starts = {}
+
+        # `_allowed[d][w]` is the set of patterns whose `d`-th syllable
+        # admits the weight `w`.
+        self._allowed = []
+        max_length = max([len(p) for p in self.patterns] or [0])
+        for depth in range(max_length):
+            by_weight = {}
+            for weight in (Weights.LAGHU, Weights.GURU):
+                by_weight[weight] = _to_mask(
+                    depth < len(p) and p[depth] in (weight, Weights.EITHER)
+                    for p in self.patterns)
+            self._allowed.append(by_weight)
+
+        # Maps ``(depth, alive)`` to the state with that set of patterns
+        # alive after `depth` syllables.
+        self._states = {}
+
+        # The number of transitions kept so far.
+        self._size = 0
+        for length in set(len(p) for p in self.patterns):
+            alive = _to_mask(len(p) == length for p in self.patterns)
+            self.starts[length] = self._state(0, alive)
+
+    def match_all(self, scan):
+        """Return the indices of all patterns that match `scan`.
+
+        :param scan: a string of syllable weights
+        :rtype: a tuple of indices, in priority order
+        """
+        state = self.starts.get(len(scan))
+        if state is None:
+            return ()
+        stride = self.STRIDE
+        for i in range(0, len(scan), stride):
+            chunk = scan[i:i + stride]
+            following = state.transitions.get(chunk)
+            if following is None:
+                following = self._step(state, chunk)
+            if following is _DEAD:
+                return ()
+            state = following
+        return state.accepts
+
+    def match_all_many(self, scans):
+        """Return the result of `match_all` for each of many scans.
+
+        :param scans: an iterable of scans
+        :rtype: a list of tuples of indices, in input order
+        """
+        match_all = self.match_all
+        return [match_all(scan) for scan in scans]
+
+    def match(self, scan):
+        """Return the index of the first pattern that matches `scan`.
+
+        :param scan: a string of syllable weights
+        :rtype: an index, or ``None`` if no pattern matches
+        """
+        matches = self.match_all(scan)
+        if matches:
+            return matches[0]
+        return None
+
+    def _step(self, state, chunk):
+        """Add and return the transition from `state` on `chunk`."""
+        alive = state.alive
+        allowed = self._allowed
+        for depth, weight in enumerate(chunk, state.depth):
+            alive &= allowed[depth].get(weight, 0)
+        depth = state.depth + len(chunk)
+        if self._size >= self.MAX_TRANSITIONS:
+            # Follow the transition without keeping it.
+            return self._new_state(depth, alive) if alive else _DEAD
+        following = self._state(depth, alive) if alive else _DEAD
+        self._size += 1
+        state.transitions[chunk] = following
+        return following
+
+    def _state(self, depth, alive):
+        """Return the state for some set of live patterns, creating it
+        if needed.
+
+        `setdefault` keeps this safe when several threads add the same
+        state at once.
+        """
+        key = (depth, alive)
+        state = self._states.get(key)
+        if state is None:
+            state = self._states.setdefault(key,
+                                            self._new_state(depth, alive))
+        return state
+
+    def _new_state(self, depth, alive):
+        lowest = (alive & -alive).bit_length() - 1
+        if depth == len(self.patterns[lowest]):
+            return _State(depth, alive, _indices(alive))
+        return _State(depth, alive, ())
+
+    def __len__(self):
+        """Return the number of states built so far."""
+        return len(self._states)
+
+
+class _State(object):
+
+    __slots__ = ('depth', 'alive', 'accepts', 'transitions')
+
+    def __init__(self, depth, alive, accepts):
+        self.depth = depth
+        self.alive = alive
+        self.accepts = accepts
+        self.transitions = {}
+
+    def __reduce__(self):
+        # Keep `_DEAD` a singleton through pickling.
+        if self is _DEAD:
+            return '_DEAD'
+        return (_State, (self.depth, self.alive, self.accepts),
+                self.transitions)
+
+    def __setstate__(self, transitions):
+        self.transitions = transitions
+
+
+# The state reached once no pattern is alive.
+_DEAD = _State(-1, 0, ())
+
+
+def _to_mask(flags):
+    """Return a bitmask with bit `i` set if the `i`-th flag is true."""
+    digits = ''.join('1' if flag else '0' for flag in flags)
+    if not digits:
+        return 0
+    return int(digits[::-1], 2)
+
+
+def _indices(mask):
+    """Return the positions of the set bits in `mask`, lowest first."""
+    returned = []
+    while mask:
+        low = mask & -mask
+        returned.append(low.bit_length() - 1)
+        mask ^= low
+    return tuple(returned)
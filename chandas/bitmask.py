@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+    chandas.bitmask
+    ~~~~~~~~~~~~~~~
+
+    Integer encodings of scans, for matching them with a few dict lookups.
+
+    :license: MIT
+"""
+
+from .automaton import Automaton
+from .enums import Weights
+
+
+def encode_scan(scan):
+    """Return a scan as an integer, where each guru is a 1 bit.
+
+    The first syllable is the highest bit. The length of the scan is
+    not kept, so scans are compared only with scans of the same length.
+
+    :param scan: a string of syllable weights
+    """
+    if not scan:
+        return 0
+    return int(scan.replace(Weights.GURU, '1').replace(Weights.LAGHU, '0'), 2)
+
+
+def decode_scan(bits, length):
+    """Return the scan that `encode_scan` encoded as `bits`.
+
+    :param bits: an encoded scan
+    :param length: the length of the scan
+    """
+    if not length:
+        return ''
+    digits = format(bits, '0%db' % length)
+    return digits.replace('1', Weights.GURU).replace('0', Weights.LAGHU)
+
+
+def encode_pattern(pattern):
+    """Return a pattern as a ``(mask, value)`` pair of integers.
+
+    `mask` has a 1 bit for each syllable that isn't ``'.'``, and `value`
+    is the pattern's gurus, laid out as in `encode_scan`. A scan with
+    the same length matches the pattern if ``bits & mask == value``.
+
+    :param pattern: a string over ``'L'``, ``'G'`` and ``'.'``
+    """
+    mask = value = 0
+    for weight in pattern:
+        mask <<= 1
+        value <<= 1
+        if weight != Weights.EITHER:
+            mask |= 1
+            if weight == Weights.GURU:
+                value |= 1
+    return mask, value
+
+
+class PatternIndex(object):
+
+    """Matches a scan against a list of syllable patterns by lookup.
+
+    Each pattern is a string over ``'L'``, ``'G'`` and ``'.'``, where
+    ``'.'`` matches either weight. Patterns are grouped by length and
+    by the positions of their wildcards. Within a group, patterns are
+    keyed by their value, so matching a scan costs one encoding and one
+    dict lookup for each group of its length. Fully fixed patterns
+    share the group whose mask has every bit set.
+
+    Most catalogs have only one or two groups per length. A length with
+    more than `MAX_GROUPS` groups of wildcard patterns would cost more
+    lookups as the catalog grows, so its wildcard patterns are matched
+    by an `Automaton` instead, whose cost doesn't depend on the number
+    of patterns.
+    """
+
+    #: The most groups of wildcard patterns of one length that are
+    #: matched by lookup.
+    MAX_GROUPS = 8
+
+    def __init__(self, patterns):
+        #: The patterns, in priority order.
+        self.patterns = list(patterns)
+
+        # `_groups[n]` is a list of ``(mask, values)`` pairs for the
+        # patterns of length `n`, where `values` maps a pattern value
+        # to the indices of the patterns with that value.
+        self._groups = {}
+        by_mask = {}
+        for i, pattern in enumerate(self.patterns):
+            mask, value = encode_pattern(pattern)
+            key = (len(pattern), mask)
+            if key not in by_mask:
+                by_mask[key] = {}
+                self._groups.setdefault(len(pattern), []).append(
+                    (mask, by_mask[key]))
+            by_mask[key].setdefault(value, []).append(i)
+
+        for groups in self._groups.values():
+            for mask, values in groups:
+                for value, indices in values.items():
+                    values[value] = tuple(indices)
+
+        # Lengths with too many groups of wildcard patterns match them
+        # with an `Automaton`, which stands in for those groups.
+        for length, groups in self._groups.items():
+            full = (1 << length) - 1
+            wild = [values for mask, values in groups if mask != full]
+            if len(wild) <= self.MAX_GROUPS:
+                continue
+            indices = sorted(i for values in wild
+                             for group in values.values() for i in group)
+            group = _AutomatonGroup(
+                [self.patterns[i] for i in indices], indices, length)
+            groups[:] = [(mask, values) for mask, values in groups
+                         if mask == full]
+            groups.append((full, group))
+
+    def match_all(self, scan):
+        """Return the indices of all patterns that match `scan`.
+
+        :param scan: a string of syllable weights
+        :rtype: a tuple of indices, in priority order
+        """
+        groups = self._groups.get(len(scan))
+        if groups is None:
+            return ()
+        return self._match_groups(groups, encode_scan(scan))
+
+    def match_all_bits(self, bits, length):
+        """Return the indices of all patterns that match an encoded scan.
+
+        :param bits: a scan encoded by `encode_scan`
+        :param length: the length of the scan
+        :rtype: a tuple of indices, in priority order
+        """
+        groups = self._groups.get(length)
+        if groups is None:
+            return ()
+        return self._match_groups(groups, bits)
+
+    def _match_groups(self, groups, bits):
+        if len(groups) == 1:
+            mask, values = groups[0]
+            return values.get(bits & mask, ())
+
+        returned = ()
+        for mask, values in groups:
+            returned += values.get(bits & mask, ())
+        return tuple(sorted(returned))
+
+    def match_all_many(self, scans):
+        """Return the result of `match_all` for each of many scans.
+
+        Scans are grouped by length, so the groups for each length are
+        looked up once, and scans of a length that no pattern has are
+        never encoded.
+
+        :param scans: an iterable of scans
+        :rtype: a list of tuples of indices, in input order
+        """
+        scans = list(scans)
+        by_length = {}
+        for i, scan in enumerate(scans):
+            by_length.setdefault(len(scan), []).append(i)
+
+        returned = [()] * len(scans)
+        match_groups = self._match_groups
+        for length, rows in by_length.items():
+            groups = self._groups.get(length)
+            if groups is None:
+                continue
+            for i in rows:
+                returned[i] = match_groups(groups, encode_scan(scans[i]))
+        return returned
+
+    def match(self, scan):
+        """Return the index of the first pattern that matches `scan`.
+
+        :param scan: a string of syllable weights
+        :rtype: an index, or ``None`` if no pattern matches
+        """
+        matches = self.match_all(scan)
+        if matches:
+            return matches[0]
+        return None
+
+
+class _AutomatonGroup(object):
+
+    """Matches encoded scans of one length with an `Automaton`.
+
+    This stands in for the `values` dict of a group in `PatternIndex`:
+    `get` takes a scan's bits and returns the indices of the patterns
+    that match it.
+    """
+
+    def __init__(self, patterns, indices, length):
+        self.automaton = Automaton(patterns)
+        self.indices = tuple(indices)
+        self.length = length
+
+    def get(self, bits, default=None):
+        matches = self.automaton.match_all(decode_scan(bits, self.length))
+        if not matches:
+            return default
+        indices = self.indices
+        return tuple(indices[i] for i in matches)
@@ -8,21 +8,77 @@
     :license: MIT
 """
 
+import hashlib
 import json
+import os
+from bisect import bisect_left
 
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from .approximate import ApproximateMatcher
+from .bitmask import PatternIndex, encode_scan
 from .enums import Weights
-from .padyas import Ardhasamavrtta, Jati, Samavrtta, Vishamavrtta
-from .wrappers import Block, Line
+from .metrics import Stopwatch
+from .padyas import (Ardhasamavrtta, Jati, Samavrtta, Vishamavrtta,
+                     cached_property)
+from .wrappers import Block, Line, scan_offsets, scan_to_gana
+
+
+#: The version of the snapshot format. Snapshots made with a different
+#: version are rebuilt or rejected.
+SNAPSHOT_VERSION = 3
+
+# The stopwatch used when a classifier has no metrics. It records
+# nothing.
+_NO_STOPWATCH = Stopwatch()
 
 
 class Classifier(object):
 
     """Scans some raw input and identifies its meter."""
 
+    #: An optional `Metrics`. If set, `classify` times each of its
+    #: stages, and `classify`, `classify_many` and `classify_lines`
+    #: count their results. ``None`` by default, which costs nothing.
+    metrics = None
+
     def __init__(self, vrttas=None, jatis=None):
         self.vrttas = vrttas or []
         self.jatis = jatis or []
 
+        # All vṛtta patterns, merged in catalog order. The index groups
+        # them by syllable count and wildcard positions, so a scan is
+        # matched with one dict lookup per group.
+        self._vrtta_index = PatternIndex(v.verse_pattern for v in self.vrttas)
+
+        # Every span of pādas that a single line could hold, merged in
+        # catalog order. Each entry is a pair of a vṛtta and the indices
+        # of the pādas in the line.
+        self._line_entries = []
+        line_patterns = []
+        for vrtta in self.vrttas:
+            for padas, pattern in vrtta.line_patterns:
+                self._line_entries.append((vrtta, padas))
+                line_patterns.append(pattern)
+        self._line_index = PatternIndex(line_patterns)
+
+        # Maps a verse's total mātrā count to the jātis it could match,
+        # in catalog order.
+        self._jati_index = {}
+        for jati in self.jatis:
+            totals = set(x for _, ends in jati.boundaries for x in ends)
+            for total in totals:
+                self._jati_index.setdefault(total, []).append(jati)
+
+    @cached_property
+    def _vrtta_matcher(self):
+        """The `ApproximateMatcher` for all vṛtta patterns, built on
+        first use by `classify_approximate` or `detect`."""
+        return ApproximateMatcher(v.verse_pattern for v in self.vrttas)
+
     @classmethod
     def from_json_file(self, path):
         """Create a classifier from some JSON file.
@@ -30,116 +86,366 @@ class Classifier(object):
         :param path: path to some JSON file.
         """
         with open(path) as f:
-            data = json.load(f)
-
-            vrttas = []
-            jatis = []
-            for datum in data:
-                len_pattern = len(datum['pattern'])
-                if datum.get('counts'):
-                    cls = Jati
-                elif len_pattern == 1:
-                    cls = Samavrtta
-                elif len_pattern == 2:
-                    cls = Ardhasamavrtta
-                elif len_pattern == 4:
-                    cls = Vishamavrtta
-                else:
-                    raise NotImplementedError
-
-                padya = cls(**datum)
-                if cls is Jati:
-                    jatis.append(padya)
-                else:
-                    vrttas.append(padya)
-            return Classifier(vrttas=vrttas, jatis=jatis)
+            return self.from_data(json.load(f))
+
+    @classmethod
+    def from_data(self, data):
+        """Create a classifier from some parsed JSON data.
+
+        :param data: a list of meters, in the format described in the
+                     README.
+        """
+        vrttas = []
+        jatis = []
+        for datum in data:
+            len_pattern = len(datum['pattern'])
+            if datum.get('counts'):
+                cls = Jati
+            elif len_pattern == 1:
+                cls = Samavrtta
+            elif len_pattern == 2:
+                cls = Ardhasamavrtta
+            elif len_pattern == 4:
+                cls = Vishamavrtta
+            else:
+                raise NotImplementedError
+
+            padya = cls(**datum)
+            if cls is Jati:
+                jatis.append(padya)
+            else:
+                vrttas.append(padya)
+        return Classifier(vrttas=vrttas, jatis=jatis)
+
+    @classmethod
+    def from_snapshot(self, path, source=None):
+        """Load a classifier from a snapshot made by `save_snapshot`.
+
+        A snapshot holds the fully built classifier, so loading it skips
+        parsing the catalog and building the indexes.
+
+        If `source` is given, the snapshot is rebuilt from it whenever
+        the snapshot is missing, can't be loaded, was made with another
+        snapshot version, or was made from different JSON.
+
+        :param path: path to the snapshot
+        :param source: path to the JSON file the snapshot is built from
+        """
+        digest = _file_digest(source) if source else None
+        try:
+            with open(path, 'rb') as f:
+                header = pickle.load(f)
+                if (isinstance(header, dict) and
+                        header.get('version') == SNAPSHOT_VERSION and
+                        (digest is None or header.get('source') == digest)):
+                    return pickle.load(f)
+        except Exception:
+            # A stale snapshot can fail in many ways, e.g. with an
+            # `ImportError` if it refers to a module that is gone.
+            if source is None:
+                raise
+
+        if source is None:
+            raise ValueError('Snapshot %r is out of date' % path)
+        classifier = self.from_json_file(source)
+        classifier.save_snapshot(path, source)
+        return classifier
+
+    def save_snapshot(self, path, source=None):
+        """Save the classifier to a snapshot file.
+
+        The file is written to a temporary path first and then moved
+        into place, so other processes never see a partial snapshot.
+
+        :param path: path to the snapshot
+        :param source: path to the JSON file the classifier was built
+                       from, used by `from_snapshot` to detect changes
+        """
+        header = {
+            'version': SNAPSHOT_VERSION,
+            'source': _file_digest(source) if source else None,
+        }
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(header, f, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
+        getattr(os, 'replace', os.rename)(tmp_path, path)
 
     @classmethod
     def split_into_padas(self, raw, padya):
-        block = Block(raw)
+        """Split some input into its pādas.
 
-        # Jāti
-        if hasattr(padya, 'counts'):
-            matras = []
-            scan = ''.join(block.scan)
-            for syllable, weight in zip(block.syllables, scan):
-                matras.append(syllable)
-                if weight == Weights.GURU:
-                    matras.append('')
-            a, b, c, d = padya.counts
-            b += a
-            if matras[b - 1]:
-                b -= 1
-            c += b
-
-            groups = [matras[:a], matras[a:b], matras[b:c], matras[c:]]
-            return [Line(''.join(x)) for x in groups]
+        :param raw: an input string, or a `Block` that was already
+                    scanned
+        :param padya: the `Padya` that the input matches
+        :rtype: a list of `Line` objects, one per pāda
+        """
+        block = raw if isinstance(raw, Block) else Block(raw)
+        syllables = block.syllables
+        spans = _pada_spans(padya, ''.join(block.scan))
+        return [Line(''.join(syllables[i:j])) for i, j in spans]
 
-        # Vṛtta
+    @classmethod
+    def all_pada_splits(self, raw, padya, ganas=True):
+        """Return every valid way to split some input into its pādas.
+
+        A vṛtta has only one split, but a *jāti* can have several; see
+        `jati_splits`. `split_into_padas` returns the first of them.
+
+        :param raw: an input string, or a `Block` that was already
+                    scanned
+        :param padya: the `Padya` that the input matches
+        :param ganas: whether to check the gaṇa rules of *āryā*-family
+                      *jātis*
+        :rtype: a list of splits, each a list of `Line` objects, one
+                per pāda
+        """
+        block = raw if isinstance(raw, Block) else Block(raw)
+        syllables = block.syllables
+        block_scan = ''.join(block.scan)
+        if hasattr(padya, 'counts'):
+            splits = jati_splits(padya, block_scan, ganas)
         else:
-            padas = []
-            offset = 0
-            syllables = block.syllables
-            for scan in padya.scans:
-                length = len(scan)
-                padas.append(Line(''.join(syllables[offset:offset+len(scan)])))
-                offset += length
-            return padas
-
-    def classify(self, raw):
+            splits = [_pada_spans(padya, block_scan)]
+        return [[Line(''.join(syllables[i:j])) for i, j in spans]
+                for spans in splits]
+
+    def classify(self, raw, as_result=False):
         """Identify the meter of some input.
 
         This returns a `Padya`, or ``None`` if the meter couldn't be
         determined.
 
         :param raw: an input string
+        :param as_result: if ``True``, return a `Result` instead of a
+                          `Padya`. The result keeps the scanned input,
+                          so splitting it into pādas costs nothing
+                          extra.
         :rtype: a `Padya`
         """
+        metrics = self.metrics
+        watch = _NO_STOPWATCH if metrics is None else metrics.stopwatch()
         block = Block(raw)
+        watch.lap('block')
         block_scan = ''.join(block.scan)
+        watch.lap('scan')
 
         # Vṛtta
-        # Exact regex match on the input scan.
-        for vrtta in self.vrttas:
-            if vrtta.regex.match(block_scan):
-                return vrtta
+        padya = self.match_vrtta(block_scan)
+        watch.lap('vrtta')
 
         # Jāti
+        if padya is None:
+            padya = self.match_jati(block_scan)
+            watch.lap('jati')
+
+        if metrics is not None:
+            metrics.record(padya)
+        if as_result and padya is not None:
+            return Result(padya, block, _pada_spans(padya, block_scan))
+        return padya
+
+    def classify_all(self, raw):
+        """Identify every meter that some input matches.
+
+        `classify` returns only the first match in catalog order, but
+        a scan can match several meters, e.g. overlapping catalog
+        entries or related *jātis*. The vṛttas come from a single
+        lookup in the vṛtta index, and the *jātis* from a single pass
+        over the *jātis* of the input's length.
+
+        :param raw: an input string
+        :rtype: a list of `Result`, one per matching meter. Vṛttas come
+                first, then *jātis*, each in catalog order. Each result
+                has the pāda boundaries implied by its meter.
+        """
+        block = Block(raw)
+        block_scan = ''.join(block.scan)
+        padyas = [self.vrttas[i]
+                  for i in self._vrtta_index.match_all(block_scan)]
+        padyas.extend(self._iter_jatis(*_matra_bits(block_scan)))
+        return [Result(padya, block, _pada_spans(padya, block_scan))
+                for padya in padyas]
+
+    def classify_many(self, data):
+        """Identify the meter of many inputs at once.
+
+        This gives the same results as calling `classify` on each
+        input, but identical inputs are scanned once and identical
+        scans are matched once.
+
+        :param data: an iterable of input strings or `Block` objects,
+                     e.g. the output of `iter_blocks`
+        :rtype: a list of `Padya` or ``None``, in input order
+        """
+        raw_scans = {}
+        scans = []
+        for datum in data:
+            if isinstance(datum, Block):
+                scans.append(''.join(datum.scan))
+                continue
+            try:
+                scans.append(raw_scans[datum])
+            except KeyError:
+                scan = raw_scans[datum] = ''.join(Block(datum).scan)
+                scans.append(scan)
+
+        unique = list(set(scans))
+        matches = self._vrtta_index.match_all_many(unique)
+        padyas = {}
+        for scan, indices in zip(unique, matches):
+            if indices:
+                padyas[scan] = self.vrttas[indices[0]]
+            else:
+                padyas[scan] = self.match_jati(scan)
+        returned = [padyas[scan] for scan in scans]
+
+        metrics = self.metrics
+        if metrics is not None:
+            for padya in returned:
+                metrics.record(padya)
+        return returned
+
+    def classify_approximate(self, raw, max_errors=2):
+        """Find the vṛttas closest to some noisy input.
+
+        This is meant for input with a few wrong syllable weights, such
+        as OCR output, where `classify` returns ``None``. The distance
+        between the input and a vṛtta counts syllable substitutions,
+        insertions and deletions. *Jātis* are not considered.
+
+        :param raw: an input string
+        :param max_errors: the largest distance to report
+        :rtype: a list of ``(vrtta, distance, edits)`` tuples, ordered by
+                distance and then by catalog order. `edits` lists the
+                mismatching positions; see `approximate.align`.
+        """
+        block_scan = ''.join(Block(raw).scan)
+        matches = self._vrtta_matcher.match(block_scan, max_errors)
+        return [(self.vrttas[i], distance, edits)
+                for i, distance, edits in matches]
+
+    def detect(self, raw, min_syllables=0):
+        """Find every span of some running text that matches a meter.
+
+        This is meant for verses embedded in prose, or for text whose
+        line breaks don't match its pādas. The whole input is scanned as
+        one stream of syllables, so line breaks and block boundaries are
+        ignored.
+
+        *Vṛttas* are found with a single pass of `ApproximateMatcher.search`
+        over the stream. For *jātis*, each syllable is tried as the start
+        of a verse by looking up the running *mātrā* totals that its
+        pāda boundaries need, so both searches take linear time in the
+        length of the input.
+
+        Spans may overlap, and *jātis* in particular match much more
+        prose than *vṛttas* do.
+
+        :param raw: an input string
+        :param min_syllables: the fewest syllables a span may have
+        :rtype: a list of ``(start, end, padya)`` tuples, where `start`
+                and `end` are offsets in `raw`. The list is ordered by
+                `start`, then by `end`, then by catalog order with
+                *vṛttas* first.
+        """
+        scan, starts, ends = scan_offsets(raw)
+
+        # Pairs of syllable spans and meters.
+        found = []
+        patterns = self._vrtta_matcher.patterns
+        for j, index in self._vrtta_matcher.search(scan):
+            i = j - len(patterns[index])
+            if j - i >= min_syllables:
+                found.append(((i, j), index, self.vrttas[index]))
+
+        # `positions[t]` is the number of syllables before the running
+        # *mātrā* total `t`.
+        totals = [0]
+        for weight in scan:
+            totals.append(totals[-1] + (1 if weight == Weights.LAGHU else 2))
+        positions = dict((t, i) for i, t in enumerate(totals))
+
+        num_vrttas = len(self.vrttas)
+        jatis = [(num_vrttas + k, jati, jati.boundaries)
+                 for k, jati in enumerate(self.jatis)]
+        for i, base in enumerate(totals):
+            for k, jati, boundaries in jatis:
+                seen = set()
+                for required, jati_ends in boundaries:
+                    if not all(base + x in positions for x in required):
+                        continue
+                    for x in jati_ends:
+                        j = positions.get(base + x)
+                        if (j is not None and j not in seen and
+                                j - i >= min_syllables):
+                            seen.add(j)
+                            found.append(((i, j), k, jati))
+
+        found.sort(key=lambda x: (x[0], x[1]))
+        return [(starts[i], ends[j - 1], padya)
+                for (i, j), _, padya in found if j > i]
+
+    def match_vrtta(self, block_scan):
+        """Return the first vṛtta that matches some scan, or ``None``.
+
+        This is the first stage of `classify`. The scan must match a
+        vṛtta's pattern exactly, and the index returns the first match
+        in catalog order.
+
+        :param block_scan: the scan of the whole input
+        """
+        index = self._vrtta_index.match(block_scan)
+        if index is None:
+            return None
+        return self.vrttas[index]
+
+    def match_jati(self, block_scan):
+        """Return the first *jāti* that matches some scan, or ``None``.
+
+        This is the second stage of `classify`, for scans that match no
+        vṛtta.
+
+        :param block_scan: the scan of the whole input
+        """
         # Consider a *jāti* definition (a, b, c, d), where `a` denotes
         # the *mātrā* length of *pāda* A. To verify the input, we check
         # whether it is possible to divide the input into chunks of
         # length `a`, `b`, `c` and `d`.
         #
-        # However, *pāda* B can be either `b` or `b - 1` long, and
-        # likewise for *pāda* D.
-        #
         # The algorithm first computes the *mātrā* length for all
-        # `scan[:i]`. After that, it's O(1) to check whether the input
-        # conforms to some *jāti*.
-        totals = set()
-        total = 0
-        for syllable in block_scan:
-            total += 1 if syllable == Weights.LAGHU else 2
-            totals.add(total)
-        for jati in self.jatis:
-            # `x` is the running sum up to the end of pada `x`
-            a, b, c, d = jati.counts
-            b += a
-            c += b
-            d += c
-            if a in totals:
-                if b in totals and c in totals:
-                    if d in totals or d - 1 in totals:
-                        return jati
-
-                # Must consider both paths -> no elif
-                if b - 1 in totals and c - 1 in totals:
-                    if d - 1 in totals or d - 2 in totals:
-                        return jati
+        # `scan[:i]` as a bitset. After that, each *jāti* is checked
+        # with a few bitwise operations against its precompiled masks.
+        # Only the *jātis* whose length fits the total length of the
+        # input are checked.
+        bits, total = _matra_bits(block_scan)
+        return self._match_jati_bits(bits, total)
 
+    def _match_jati_bits(self, bits, total):
+        """Return the first *jāti* that matches some running *mātrā*
+        totals, or ``None``.
+
+        :param bits: the bitset from `_matra_bits`
+        :param total: the total *mātrā* length of the input
+        """
+        for jati in self._iter_jatis(bits, total):
+            return jati
         return None
 
-    def classify_lines(self, raw):
+    def _iter_jatis(self, bits, total):
+        """Iterate over all *jātis* that match some running *mātrā*
+        totals, in catalog order.
+
+        See `_match_jati_bits` for the meaning of the arguments.
+        """
+        end = 1 << total
+        for jati in self._jati_index.get(total, ()):
+            for required, ends in jati.masks:
+                if bits & required == required and end & ends:
+                    yield jati
+                    break
+
+    def classify_lines(self, raw, all_candidates=False):
         """Classify the lines in some block individually.
 
         This should be used only if `classify` could not parse the
@@ -148,19 +454,336 @@ class Classifier(object):
         The pādas need to be passed together in one string; the weight
         at the end of a pāda is affected by how the next pāda starts.
 
+        A line can match a single pāda, half of a verse, or a whole
+        verse. By default, this returns a list of ``(line, vrtta)``
+        pairs, where `vrtta` is the first vṛtta in catalog order that
+        the line matches, or ``None``.
+
         :param raw: an input string
+        :param all_candidates: if ``True``, pair each line with a list
+                               of all ``(vrtta, padas)`` pairs it
+                               matches instead, where `padas` is a
+                               tuple of the indices of the pādas the
+                               line could fill.
         """
+        metrics = self.metrics
+        watch = _NO_STOPWATCH if metrics is None else metrics.stopwatch()
         padas = []
         block = Block(raw)
-        line_scan_pairs = zip(block.lines, block.scan)
-        for line, scan in line_scan_pairs:
-            appended = False
-            for vrtta in self.vrttas:
-                match = vrtta.partial_regex.match(scan)
-                if match and len(match.group(0)) == len(scan):
-                    padas.append((line, vrtta))
-                    appended = True
-                    break
-            if not appended:
+        entries = self._line_entries
+        for line, scan in zip(block.lines, block.scan):
+            matches = self._line_index.match_all(scan)
+            if all_candidates:
+                padas.append((line, [entries[i] for i in matches]))
+            elif matches:
+                padas.append((line, entries[matches[0]][0]))
+            else:
                 padas.append((line, None))
+
+        watch.lap('lines')
+        if metrics is not None:
+            metrics.lines += len(padas)
         return padas
+
+
+class Result(object):
+
+    """The result of classifying some input.
+
+    This keeps the scanned `Block` and the pāda boundaries, so that the
+    input doesn't need to be scanned again to split it into pādas.
+    """
+
+    __slots__ = ('padya', 'block', 'spans', '_padas')
+
+    def __init__(self, padya, block, spans):
+        #: The matched `Padya`.
+        self.padya = padya
+
+        #: The scanned `Block`.
+        self.block = block
+
+        #: The syllables in each pāda, as ``(start, end)`` pairs.
+        self.spans = spans
+
+    def __unicode__(self):
+        return u"<Result('{}')>".format(self.padya.name)
+
+    def __repr__(self):
+        returned = self.__unicode__()
+        if not isinstance(returned, str):
+            # Python 2, where `repr` must return bytes.
+            returned = returned.encode('utf-8')
+        return returned
+
+    @property
+    def name(self):
+        """Return the name of the matched meter."""
+        return self.padya.name
+
+    @property
+    def padas(self):
+        """Return a `Line` for each pāda.
+
+        This is the same as `Classifier.split_into_padas`.
+        """
+        try:
+            return list(self._padas)
+        except AttributeError:
+            syllables = self.block.syllables
+            self._padas = tuple(Line(''.join(syllables[i:j]))
+                                for i, j in self.spans)
+            return list(self._padas)
+
+    @property
+    def scans(self):
+        """Return the scan of each pāda, as scanned in the block."""
+        block_scan = ''.join(self.block.scan)
+        return [block_scan[i:j] for i, j in self.spans]
+
+    @property
+    def ganas(self):
+        """Return the gaṇas of each pāda. See `Line.gana`."""
+        return [scan_to_gana(x) for x in self.scans]
+
+
+class LiveBlock(object):
+
+    """A block that is edited one line at a time, as in an editor.
+
+    The meter is kept up to date after each edit. Only the edited line
+    and the line before it are scanned again, and the verse is matched
+    from encodings of each line that are kept between edits. So the
+    cost of an edit does not depend on the length of the other lines.
+
+    :param classifier: a `Classifier`
+    :param raw: the initial input string
+    """
+
+    def __init__(self, classifier, raw):
+        #: The `Classifier` used to match the block.
+        self.classifier = classifier
+
+        #: The current `Block`.
+        self.block = Block(raw)
+
+        # For each line, its encoded scan, its length, the bitset from
+        # `_matra_bits` and its total *mātrā* length.
+        self._states = [_line_state(scan) for scan in self.block.scan]
+
+        #: The matched `Padya`, or ``None``.
+        self.padya = self._match()
+
+    def replace_line(self, i, raw):
+        """Replace one line and match the block again.
+
+        See `Block.replace_line`, which raises `ValueError` if `raw`
+        isn't a single non-empty line.
+
+        :param i: the index of the line to replace
+        :param raw: the raw text of the new line
+        :rtype: the matched `Padya`, or ``None``
+        """
+        self.block = self.block.replace_line(i, raw)
+        scan = self.block.scan
+        i %= len(scan)
+        for j in (i - 1, i):
+            if j >= 0:
+                self._states[j] = _line_state(scan[j])
+        self.padya = self._match()
+        return self.padya
+
+    @property
+    def result(self):
+        """Return the current match as a `Result`, or ``None``."""
+        padya = self.padya
+        if padya is None:
+            return None
+        return Result(padya, self.block,
+                      _pada_spans(padya, ''.join(self.block.scan)))
+
+    def _match(self):
+        bits = length = total = 0
+        matra_bits = 1
+        for line_bits, line_length, line_matras, line_total in self._states:
+            bits = (bits << line_length) | line_bits
+            length += line_length
+            matra_bits |= line_matras << total
+            total += line_total
+
+        classifier = self.classifier
+        matches = classifier._vrtta_index.match_all_bits(bits, length)
+        if matches:
+            return classifier.vrttas[matches[0]]
+        return classifier._match_jati_bits(matra_bits, total)
+
+
+def _line_state(scan):
+    """Return the encodings of a line's scan used by `LiveBlock`."""
+    matra_bits, total = _matra_bits(scan)
+    return encode_scan(scan), len(scan), matra_bits, total
+
+
+def _pada_spans(padya, block_scan):
+    """Return the syllables in each pāda of some input.
+
+    :param padya: the `Padya` that the input matches
+    :param block_scan: the scan of the whole input
+    :rtype: a list of ``(start, end)`` pairs, one per pāda
+    """
+    # Jāti
+    # Use the first valid division, if there is one. Otherwise the
+    # input doesn't match, so divide it as closely as possible.
+    if hasattr(padya, 'counts'):
+        splits = jati_splits(padya, block_scan, ganas=False)
+        if splits:
+            return splits[0]
+
+        num_syllables = len(block_scan)
+        bits, total = _matra_bits(block_scan)
+        (a, b, c), _ = padya.boundaries[0]
+        i, j, k = [_count_syllables(bits, x, num_syllables) for x in (a, b, c)]
+        return [(0, i), (i, j), (j, k), (k, num_syllables)]
+
+    # Vṛtta
+    else:
+        spans = []
+        offset = 0
+        for scan in padya.scans:
+            spans.append((offset, offset + len(scan)))
+            offset += len(scan)
+        return spans
+
+
+# The gaṇas of each half of an āryā-family verse, keyed by the mātrā
+# length of the half. Each gaṇa is a pair of its mātrā length and the
+# set of scans allowed there. The half ends with one more syllable,
+# which may be either weight.
+_GANAS_ANY = frozenset(['GG', 'LLG', 'GLL', 'LGL', 'LLLL'])
+_GANAS_ODD = _GANAS_ANY - set(['LGL'])
+_GANA_RULES = {
+    # Seven gaṇas. Odd gaṇas can't be ja, and the sixth must be ja or
+    # four laghus.
+    30: [(4, _GANAS_ODD), (4, _GANAS_ANY), (4, _GANAS_ODD), (4, _GANAS_ANY),
+         (4, _GANAS_ODD), (4, frozenset(['LGL', 'LLLL'])), (4, _GANAS_ODD)],
+    # As above, but the sixth gaṇa is a single laghu.
+    27: [(4, _GANAS_ODD), (4, _GANAS_ANY), (4, _GANAS_ODD), (4, _GANAS_ANY),
+         (4, _GANAS_ODD), (1, frozenset(['L'])), (4, _GANAS_ODD)],
+}
+
+
+def jati_splits(jati, block_scan, ganas=True):
+    """Return every way to divide some scan into the pādas of a *jāti*.
+
+    The input matches a *jāti* if it divides into pādas of its counts,
+    where pādas B and D may each be one mātrā short (see
+    `Jati.boundaries`). Since pāda B can be either length, an input can
+    have more than one valid division.
+
+    If both halves of the *jāti* have the lengths of an *āryā*-family
+    half (27 or 30 mātrās), each division must also follow the rules
+    for the gaṇas of each half. For example, an odd gaṇa can't be a
+    *ja-gaṇa* (``'LGL'``).
+
+    This takes time linear in the length of the scan.
+
+    :param jati: a `Jati`
+    :param block_scan: the scan of the whole input
+    :param ganas: if ``False``, don't check the gaṇa rules
+    :rtype: a list of divisions, each a list of ``(start, end)``
+            syllable pairs as in `Result.spans`
+    """
+    totals = [0]
+    for weight in block_scan:
+        totals.append(totals[-1] + (1 if weight == Weights.LAGHU else 2))
+    num_syllables = len(block_scan)
+    total = totals[-1]
+
+    a, b, c, d = jati.counts
+    rules = None
+    if ganas:
+        rules = (_GANA_RULES.get(a + b), _GANA_RULES.get(c + d))
+        if None in rules:
+            rules = None
+
+    returned = []
+    for required, ends in jati.boundaries:
+        if total not in ends:
+            continue
+        indices = [_find_total(totals, x) for x in required]
+        if None in indices:
+            continue
+        i, j, k = indices
+        if rules and not (_check_ganas(block_scan, totals, 0, j, rules[0]) and
+                          _check_ganas(block_scan, totals, j, num_syllables,
+                                       rules[1])):
+            continue
+        returned.append([(0, i), (i, j), (j, k), (k, num_syllables)])
+    return returned
+
+
+def _find_total(totals, x):
+    """Return the number of syllables whose mātrās add up to `x`, or
+    ``None``.
+
+    :param totals: the running mātrā totals of a scan
+    :param x: a mātrā total
+    """
+    i = bisect_left(totals, x)
+    if i < len(totals) and totals[i] == x:
+        return i
+    return None
+
+
+def _check_ganas(scan, totals, start, end, rules):
+    """Return whether a half verse follows some gaṇa rules.
+
+    :param scan: the scan of the whole input
+    :param totals: the running mātrā totals of `scan`
+    :param start: the first syllable of the half
+    :param end: the syllable after the half
+    :param rules: a list from `_GANA_RULES`
+    """
+    i = start
+    t = totals[start]
+    for length, allowed in rules:
+        t += length
+        j = _find_total(totals, t)
+        if j is None or j > end or scan[i:j] not in allowed:
+            return False
+        i = j
+    return end - i == 1
+
+
+def _matra_bits(scan):
+    """Return the running *mātrā* totals of some scan as a bitset.
+
+    Bit `i` is set if some prefix of `scan` (including the empty one)
+    is `i` *mātrās* long.
+
+    :param scan: a string of syllable weights
+    :rtype: a pair of the bitset and the total length of `scan`
+    """
+    bits = 1
+    total = 0
+    for weight in scan:
+        total += 1 if weight == Weights.LAGHU else 2
+        bits |= 1 << total
+    return bits, total
+
+
+def _count_syllables(bits, matras, num_syllables):
+    """Return how many syllables start before some *mātrā* offset.
+
+    :param bits: the bitset from `_matra_bits`
+    :param matras: a *mātrā* offset
+    :param num_syllables: the number of syllables in the scan
+    """
+    starts = bin(bits & ((1 << matras) - 1)).count('1')
+    return min(starts, num_syllables)
+
+
+def _file_digest(path):
+    """Return a digest of the contents of some file."""
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+    chandas.cli
+    ~~~~~~~~~~~
+
+    The ``python -m chandas`` command, which classifies every block in
+    some files and writes one row per block.
+
+    :license: MIT
+"""
+
+from __future__ import print_function
+
+import argparse
+import io
+import json
+import sys
+from collections import deque
+from timeit import default_timer
+
+from .classify import Classifier
+from .parallel import classify_corpus
+from .wrappers import iter_file_blocks
+
+
+#: The columns of each row, in TSV order.
+COLUMNS = ('file', 'block', 'line', 'start', 'end', 'meter')
+
+
+def iter_rows(classifier, paths, jobs=1, padas=False, chunk_size=256):
+    """Classify every block in some files, one file after another.
+
+    Files are streamed, and only the blocks that are being classified
+    are held in memory.
+
+    :param classifier: a `Classifier`
+    :param paths: a list of paths, where ``'-'`` means standard input
+    :param jobs: see `parallel.classify_corpus`
+    :param padas: if ``True``, add the text of each pāda to each row
+    :param chunk_size: see `parallel.classify_corpus`
+    :rtype: an iterator over dicts with the keys in `COLUMNS`, and
+            ``'padas'`` if `padas` is true. `start` and `end` are byte
+            offsets.
+    """
+    # The blocks sent to `classify_corpus` whose results haven't come
+    # back yet, with their file and their index in that file.
+    pending = deque()
+
+    def iter_blocks():
+        for path in paths:
+            if path == '-':
+                f = getattr(sys.stdin, 'buffer', sys.stdin)
+            else:
+                f = io.open(path, 'rb')
+            try:
+                for i, block in enumerate(iter_file_blocks(f)):
+                    pending.append((path, i, block))
+                    yield block
+            finally:
+                if path != '-':
+                    f.close()
+
+    # With `padas`, the pādas are split where each block is classified,
+    # which is in the workers if there are any.
+    for result in classify_corpus(classifier, iter_blocks(), jobs,
+                                  chunk_size, padas):
+        path, i, block = pending.popleft()
+        padya = result[1]
+        row = {
+            'file': path,
+            'block': i,
+            'line': block.line_number,
+            'start': block.offset,
+            'end': block.end_offset,
+            'meter': padya.name if padya else None,
+        }
+        if padas:
+            row['padas'] = result[2]
+        yield row
+
+
+def format_jsonl(row):
+    """Format a row as a line of JSON."""
+    line = json.dumps(row, ensure_ascii=False, sort_keys=True)
+    if isinstance(line, bytes):
+        line = line.decode('utf-8')
+    return line + u'\n'
+
+
+def format_tsv(row):
+    """Format a row as a line of tab-separated values.
+
+    Missing values are left empty, and pādas are joined by ``'/'``.
+    """
+    values = [row[key] for key in COLUMNS]
+    if 'padas' in row:
+        values.append(u'/'.join(row['padas'] or ()))
+    return u'\t'.join(u'' if x is None else u'%s' % x for x in values) + u'\n'
+
+
+def write_rows(rows, out, format, buffer_rows=1024):
+    """Write rows to a binary file, `buffer_rows` rows at a time.
+
+    :param rows: an iterable of rows from `iter_rows`
+    :param out: a file opened for writing bytes
+    :param format: ``'jsonl'`` or ``'tsv'``
+    :param buffer_rows: the number of rows to join into one write
+    :rtype: a pair of the number of rows and the number of rows with a
+            meter
+    """
+    formatter = format_tsv if format == 'tsv' else format_jsonl
+    num_rows = num_matched = 0
+    buf = []
+    for row in rows:
+        num_rows += 1
+        if row['meter'] is not None:
+            num_matched += 1
+        buf.append(formatter(row))
+        if len(buf) >= buffer_rows:
+            out.write(u''.join(buf).encode('utf-8'))
+            buf = []
+    if buf:
+        out.write(u''.join(buf).encode('utf-8'))
+    return num_rows, num_matched
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m chandas',
+        description='Classify every block of verse in some files.')
+    parser.add_argument('files', nargs='*', default=['-'],
+                        help="files to read, or '-' for standard input "
+                             "(default: standard input)")
+    parser.add_argument('--catalog', default='data/data.json',
+                        help='JSON catalog to use (default: %(default)s)')
+    parser.add_argument('--snapshot', metavar='PATH',
+                        help='load the catalog from a snapshot, which is '
+                             'rebuilt whenever the catalog changes')
+    parser.add_argument('--format', choices=('jsonl', 'tsv'), default='jsonl',
+                        help='output format (default: %(default)s)')
+    parser.add_argument('--output', '-o', metavar='PATH',
+                        help='write to a file instead of standard output')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='worker processes; 0 means one per CPU '
+                             '(default: %(default)s)')
+    parser.add_argument('--chunk-size', type=int, default=256,
+                        help='blocks sent to a worker at once '
+                             '(default: %(default)s)')
+    parser.add_argument('--padas', action='store_true',
+                        help='add the text of each pāda to each row')
+    parser.add_argument('--header', action='store_true',
+                        help='start TSV output with a row of column names')
+    parser.add_argument('--quiet', '-q', action='store_true',
+                        help="don't print a summary to standard error")
+    args = parser.parse_args(args)
+
+    start = default_timer()
+    if args.snapshot:
+        classifier = Classifier.from_snapshot(args.snapshot, args.catalog)
+    else:
+        classifier = Classifier.from_json_file(args.catalog)
+    load_seconds = default_timer() - start
+
+    if args.output:
+        out = io.open(args.output, 'wb')
+    else:
+        out = getattr(sys.stdout, 'buffer', sys.stdout)
+
+    try:
+        if args.format == 'tsv' and args.header:
+            columns = COLUMNS + (('padas',) if args.padas else ())
+            out.write(u'\t'.join(columns).encode('utf-8') + b'\n')
+        start = default_timer()
+        rows = iter_rows(classifier, args.files, args.jobs or None,
+                         args.padas, args.chunk_size)
+        num_rows, num_matched = write_rows(rows, out, args.format)
+        seconds = default_timer() - start
+    finally:
+        if args.output:
+            out.close()
+        else:
+            out.flush()
+
+    if not args.quiet:
+        print('%d blocks, %d matched, in %.2f s (%.0f blocks/s); '
+              'catalog loaded in %.2f s' % (
+                  num_rows, num_matched, seconds,
+                  num_rows / seconds if seconds else 0.0, load_seconds),
+              file=sys.stderr)
+    return 0
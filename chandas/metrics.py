@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+    chandas.metrics
+    ~~~~~~~~~~~~~~~
+
+    Optional instrumentation for the classifier.
+
+    :license: MIT
+"""
+
+import copy
+from bisect import bisect_left
+from timeit import default_timer
+
+from .padyas import Jati
+
+
+class Histogram(object):
+
+    """Counts observed values in fixed buckets.
+
+    Buckets are cumulative when exported, as in Prometheus: the bucket
+    for bound `b` counts every value less than or equal to `b`.
+    """
+
+    #: Default bucket bounds, in seconds.
+    BOUNDS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+              1e-3, 1e-2, 1e-1)
+
+    def __init__(self, bounds=BOUNDS):
+        #: The upper bound of each bucket, in increasing order.
+        self.bounds = tuple(bounds)
+
+        #: The number of values in each bucket. The last bucket holds
+        #: values larger than every bound.
+        self.counts = [0] * (len(self.bounds) + 1)
+
+        #: The number of observed values.
+        self.count = 0
+
+        #: The sum of all observed values.
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Add a value to the histogram."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self):
+        """Return the histogram as a plain dict."""
+        cumulative = []
+        total = 0
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return {
+            'buckets': list(zip(self.bounds + (float('inf'),), cumulative)),
+            'count': self.count,
+            'sum': self.sum,
+        }
+
+
+class Metrics(object):
+
+    """Counters and latency histograms for a classifier.
+
+    Set `Classifier.metrics` to record into these, or use an
+    `InstrumentedClassifier`.
+
+    :param bounds: the bucket bounds of each stage's `Histogram`
+    :param stages: the stages to time, from `STAGES`. Stages that
+                   aren't timed are not exported.
+    """
+
+    #: The timed stages, in the order they run. `Classifier.classify`
+    #: times the first four, and `Classifier.classify_lines` the last.
+    STAGES = ('block', 'scan', 'vrtta', 'jati', 'lines')
+
+    def __init__(self, bounds=Histogram.BOUNDS, stages=STAGES):
+        #: The number of verses passed to `classify`.
+        self.verses = 0
+
+        #: The number of verses that matched a vṛtta.
+        self.vrtta_hits = 0
+
+        #: The number of verses that matched a jāti.
+        self.jati_hits = 0
+
+        #: The number of verses that matched nothing.
+        self.misses = 0
+
+        #: The number of lines passed to `classify_lines`.
+        self.lines = 0
+
+        #: Maps a meter name to the number of verses that matched it.
+        self.meter_hits = {}
+
+        #: Maps each timed stage to a latency `Histogram`.
+        self.stages = dict((stage, Histogram(bounds)) for stage in stages)
+
+    def to_dict(self):
+        """Return all metrics as a plain dict."""
+        return {
+            'verses': self.verses,
+            'vrtta_hits': self.vrtta_hits,
+            'jati_hits': self.jati_hits,
+            'misses': self.misses,
+            'lines': self.lines,
+            'meter_hits': dict(self.meter_hits),
+            'stages': dict((k, v.to_dict()) for k, v in self.stages.items()),
+        }
+
+    def record(self, padya):
+        """Count the result of classifying one verse.
+
+        :param padya: a `Padya`, or ``None``
+        """
+        self.verses += 1
+        if padya is None:
+            self.misses += 1
+            return
+        if isinstance(padya, Jati):
+            self.jati_hits += 1
+        else:
+            self.vrtta_hits += 1
+        hits = self.meter_hits
+        hits[padya.name] = hits.get(padya.name, 0) + 1
+
+    def stopwatch(self):
+        """Return a `Stopwatch` that records into these metrics."""
+        return Stopwatch(self)
+
+    def to_prometheus(self, prefix='chandas'):
+        """Return all metrics in the Prometheus text format.
+
+        :param prefix: a prefix for every metric name
+        """
+        lines = []
+
+        def counter(name, help, samples):
+            name = '%s_%s' % (prefix, name)
+            lines.append('# HELP %s %s' % (name, help))
+            lines.append('# TYPE %s counter' % name)
+            for labels, value in samples:
+                lines.append('%s%s %s' % (name, _labels(labels), value))
+
+        counter('verses_total', 'Verses classified.', [({}, self.verses)])
+        counter('results_total', 'Verses classified, by result.', [
+            ({'result': 'vrtta'}, self.vrtta_hits),
+            ({'result': 'jati'}, self.jati_hits),
+            ({'result': 'miss'}, self.misses),
+        ])
+        counter('lines_total', 'Lines classified individually.',
+                [({}, self.lines)])
+        counter('meter_hits_total', 'Verses classified, by meter.',
+                [({'meter': k}, v)
+                 for k, v in sorted(self.meter_hits.items())])
+
+        name = '%s_stage_seconds' % prefix
+        lines.append('# HELP %s Time spent in each stage.' % name)
+        lines.append('# TYPE %s histogram' % name)
+        for stage in self.STAGES:
+            if stage not in self.stages:
+                continue
+            histogram = self.stages[stage].to_dict()
+            for bound, count in histogram['buckets']:
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                labels = _labels({'stage': stage, 'le': le})
+                lines.append('%s_bucket%s %d' % (name, labels, count))
+            labels = _labels({'stage': stage})
+            lines.append('%s_sum%s %r' % (name, labels, histogram['sum']))
+            lines.append('%s_count%s %d' % (name, labels, histogram['count']))
+
+        return '\n'.join(lines) + '\n'
+
+
+class Stopwatch(object):
+
+    """Times the consecutive stages of one call into some `Metrics`.
+
+    Each `lap` records the time since the previous lap, or since the
+    stopwatch was made, unless the metrics don't time that stage. A
+    stopwatch made without metrics records nothing, which is how
+    `Classifier` runs by default.
+
+    :param metrics: a `Metrics`, or ``None``
+    """
+
+    __slots__ = ('_stages', '_last')
+
+    def __init__(self, metrics=None):
+        if metrics is None:
+            self._stages = None
+            self._last = None
+        else:
+            self._stages = metrics.stages
+            self._last = default_timer()
+
+    def lap(self, stage):
+        """Record the time since the last lap for some stage.
+
+        :param stage: a key of `Metrics.stages`
+        """
+        if self._stages is None:
+            return
+        now = default_timer()
+        histogram = self._stages.get(stage)
+        if histogram is not None:
+            histogram.observe(now - self._last)
+        self._last = now
+
+
+class InstrumentedClassifier(object):
+
+    """Wraps a `Classifier` and records `Metrics` as it classifies.
+
+    This sets `Classifier.metrics` on a shallow copy of the classifier,
+    so the wrapped classifier itself is left untouched and code that
+    doesn't need metrics pays nothing for them. Every attribute of the
+    copy, e.g. `classify` or `classify_many`, is available on the
+    wrapper.
+    """
+
+    def __init__(self, classifier, metrics=None):
+        #: The recorded `Metrics`.
+        self.metrics = metrics or Metrics()
+
+        #: A copy of the wrapped `Classifier` that records `metrics`.
+        self.classifier = copy.copy(classifier)
+        self.classifier.metrics = self.metrics
+
+    def __getattr__(self, name):
+        return getattr(self.classifier, name)
+
+
+def _labels(labels):
+    """Format a dict of labels for the Prometheus text format."""
+    if not labels:
+        return ''
+    items = []
+    for key, value in sorted(labels.items()):
+        value = value.replace('\\', '\\\\').replace('"', '\\"')
+        items.append('%s="%s"' % (key, value.replace('\n', '\\n')))
+    return '{%s}' % ','.join(items)
@@ -51,6 +51,9 @@ class Vrtta(Padya):
 
     """Abstract class for syllabic meters."""
 
+    #: The spans of pādas that a single line can hold.
+    line_spans = [(0,), (1,), (2,), (3,), (0, 1), (2, 3), (0, 1, 2, 3)]
+
     @classmethod
     def _clean(self, data):
         return re.sub('[^LG.]', '', data)
@@ -62,6 +65,39 @@ class Vrtta(Padya):
         else:
             return scan[:-1] + '[LG]'
 
+    @cached_property
+    def verse_pattern(self):
+        """Return the scan of the whole verse as a single pattern.
+
+        Wildcards are kept as ``'.'``, and the final syllable of each
+        even pāda is replaced with ``'.'``.
+        """
+        scans = self.scans
+        return ''.join([scans[0], scans[1][:-1] + '.',
+                        scans[2], scans[3][:-1] + '.'])
+
+    @cached_property
+    def line_patterns(self):
+        """Return the patterns that a single line of the vṛtta can match.
+
+        This returns a list of ``(padas, pattern)`` pairs, where `padas`
+        is a tuple of the indices of the pādas in the line. The spans
+        come from `line_spans`. The final syllable of each pattern is
+        ``'.'``, and identical patterns are listed only once.
+        """
+        scans = self.scans
+        returned = []
+        seen = set()
+        for padas in self.line_spans:
+            if padas == (0, 1, 2, 3):
+                pattern = self.verse_pattern
+            else:
+                pattern = ''.join(scans[i] for i in padas)[:-1] + '.'
+            if pattern not in seen:
+                seen.add(pattern)
+                returned.append((padas, pattern))
+        return returned
+
     @cached_property
     def regex(self):
         """Return a regex to test if some input matches the vrtta."""
@@ -74,11 +110,21 @@ class Vrtta(Padya):
     def partial_regex(self):
         return self.regex
 
+    def __getstate__(self):
+        # Compiled regexes are rebuilt lazily instead of pickled.
+        state = dict(self.__dict__)
+        state.pop('regex', None)
+        state.pop('partial_regex', None)
+        return state
+
 
 class Samavrtta(Vrtta):
 
     """Represents a type of sama-vṛtta."""
 
+    #: The spans of pādas that a single line can hold.
+    line_spans = [(0,)]
+
     def __init__(self, name, pattern):
         assert len(pattern) == 1
         Vrtta.__init__(self, name, pattern * 4)
@@ -92,6 +138,9 @@ class Ardhasamavrtta(Vrtta):
 
     """Represents a type of ardha-sama-vṛtta."""
 
+    #: The spans of pādas that a single line can hold.
+    line_spans = [(0,), (1,), (0, 1)]
+
     def __init__(self, name, pattern):
         assert len(pattern) == 2
         Vrtta.__init__(self, name, pattern * 2)
@@ -117,3 +166,36 @@ class Jati(Padya):
     def __init__(self, name, pattern, counts):
         Padya.__init__(self, name, pattern * 4)
         self.counts = counts
+
+    @cached_property
+    def boundaries(self):
+        """Return the running *mātrā* totals at the pāda boundaries.
+
+        This returns a list of ``(required, ends)`` pairs, one for each
+        way of dividing the input into pādas. `required` holds the
+        totals at the ends of pādas A, B and C, and `ends` the totals
+        that the whole input may have.
+
+        *Pāda* B can be either `b` or `b - 1` long, and likewise for
+        *pāda* D.
+        """
+        # `x` is the running sum up to the end of pada `x`
+        a, b, c, d = self.counts
+        b += a
+        c += b
+        d += c
+        return [((a, b, c), (d, d - 1)),
+                ((a, b - 1, c - 1), (d - 1, d - 2))]
+
+    @cached_property
+    def masks(self):
+        """Return bitmasks to test if some input matches the jāti.
+
+        The input is described by a bitset of its running *mātrā*
+        totals, where bit `i` is set if some prefix of the input is `i`
+        *mātrās* long. This returns `boundaries` as bitsets: the input
+        matches if, for some pair, all of the bits in `required` are
+        set and its total length is one of the bits in `ends`.
+        """
+        return [(sum(1 << x for x in required), sum(1 << x for x in ends))
+                for required, ends in self.boundaries]
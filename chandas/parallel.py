@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+    chandas.parallel
+    ~~~~~~~~~~~~~~~~
+
+    Code for classifying large inputs with a pool of worker processes.
+
+    :license: MIT
+"""
+
+import itertools
+import multiprocessing
+from collections import deque
+
+from .wrappers import Block, MappedCorpus, iter_blocks, iter_file_blocks
+
+
+#: The classifier used by this worker process.
+_classifier = None
+
+#: Maps the id of each of the classifier's meters to its meter id.
+_meter_ids = None
+
+#: Maps a path to the `MappedCorpus` opened for it by this worker.
+_corpora = {}
+
+
+def _init_worker(classifier):
+    global _classifier, _meter_ids
+    _classifier = classifier
+    _meter_ids = _make_meter_ids(classifier)
+
+
+def _work(chunk):
+    return _classify_chunk(_classifier, _meter_ids, chunk)
+
+
+def _work_padas(chunk):
+    return _classify_chunk(_classifier, _meter_ids, chunk, padas=True)
+
+
+def _work_range(task):
+    path, start, end = task
+    corpus = _corpora.get(path)
+    if corpus is None:
+        corpus = _corpora[path] = MappedCorpus(path)
+    return _classify_range(_classifier, _meter_ids, corpus, start, end)
+
+
+def _make_meter_ids(classifier):
+    return dict((id(p), i) for i, p in enumerate(meters(classifier)))
+
+
+def _classify_chunk(classifier, meter_ids, chunk, padas=False):
+    """Classify a chunk of blocks.
+
+    Workers return meter ids instead of `Padya` objects so that the
+    results are cheap to send back.
+
+    :param chunk: a pair of the index of the first block and a list of
+                  raw blocks
+    :param padas: if ``True``, return a pair of the meter id and the
+                  text of each pāda for each block. The pādas are
+                  split here, while each block's scan is still at hand.
+    """
+    start, raws = chunk
+    if not padas:
+        padyas = classifier.classify_many(raws)
+        return start, [meter_ids.get(id(p)) for p in padyas]
+
+    blocks = [Block(raw) for raw in raws]
+    returned = []
+    for block, padya in zip(blocks, classifier.classify_many(blocks)):
+        if padya is None:
+            returned.append((None, None))
+        else:
+            lines = classifier.split_into_padas(block, padya)
+            returned.append((meter_ids.get(id(padya)),
+                             [line.raw for line in lines]))
+    return start, returned
+
+
+def _classify_range(classifier, meter_ids, corpus, start, end):
+    """Classify the blocks that start in some range of a corpus.
+
+    :rtype: a list of ``(start, end, meter_id)`` tuples
+    """
+    spans = list(corpus.spans(start, end))
+    padyas = classifier.classify_many(corpus.block(i, j) for i, j in spans)
+    return [(i, j, meter_ids.get(id(p))) for (i, j), p in zip(spans, padyas)]
+
+
+def _iter_raw(data):
+    """Iterate over the raw text of each block in `data`."""
+    if hasattr(data, 'read'):
+        data = iter_file_blocks(data)
+    elif hasattr(data, 'splitlines'):
+        data = iter_blocks(data)
+    for datum in data:
+        if isinstance(datum, Block):
+            yield datum.raw
+        else:
+            yield datum
+
+
+def _iter_chunks(raws, chunk_size):
+    start = 0
+    while True:
+        chunk = list(itertools.islice(raws, chunk_size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+def _iter_pool_results(pool, chunks, max_pending, work=_work):
+    """Yield the results of `work` for each chunk in order.
+
+    At most `max_pending` chunks are in flight at a time, so the input
+    is consumed only as fast as the workers can classify it.
+    """
+    try:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(work, (chunk,)))
+            if len(pending) >= max_pending:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def meters(classifier):
+    """Return the meters of a classifier, indexed by meter id.
+
+    :param classifier: a `Classifier`
+    """
+    return classifier.vrttas + classifier.jatis
+
+
+def classify_corpus(classifier, data, jobs=None, chunk_size=256,
+                    padas=False):
+    """Classify every block in some large input.
+
+    The blocks are sent to a pool of worker processes in chunks of
+    `chunk_size`. Results come back in input order.
+
+    :param classifier: a `Classifier`
+    :param data: a string, a file object, or an iterable of raw blocks
+                 or `Block` objects, e.g. the output of `iter_blocks`
+    :param jobs: the number of worker processes. By default, this is
+                 the number of CPUs. If 1, everything runs in the
+                 current process.
+    :param chunk_size: the number of blocks sent to a worker at once
+    :param padas: if ``True``, the workers also split each matched
+                  block into its pādas
+    :rtype: an iterator over pairs of a block index and a `Padya` or
+            ``None``. If `padas` is true, each pair gets a third item:
+            a list of the text of each pāda, or ``None``.
+    """
+    jobs = jobs or multiprocessing.cpu_count()
+    chunks = _iter_chunks(_iter_raw(data), chunk_size)
+    if jobs == 1:
+        meter_ids = _make_meter_ids(classifier)
+        results = (_classify_chunk(classifier, meter_ids, c, padas)
+                   for c in chunks)
+    else:
+        pool = multiprocessing.Pool(jobs, _init_worker, (classifier,))
+        work = _work_padas if padas else _work
+        results = _iter_pool_results(pool, chunks, 2 * jobs, work)
+
+    padyas = meters(classifier)
+    for start, chunk_results in results:
+        for i, result in enumerate(chunk_results, start):
+            meter_id = result[0] if padas else result
+            padya = None if meter_id is None else padyas[meter_id]
+            if padas:
+                yield i, padya, result[1]
+            else:
+                yield i, padya
+
+
+def classify_mapped(classifier, path, jobs=None, range_size=1 << 20):
+    """Classify every block in a large file without reading it whole.
+
+    The file is memory-mapped and divided into ranges of about
+    `range_size` bytes. Workers are sent only the path and a range, and
+    each one maps the file itself and decodes just the blocks in its
+    range. See `MappedCorpus`.
+
+    :param classifier: a `Classifier`
+    :param path: the path to the file
+    :param jobs: see `classify_corpus`
+    :param range_size: the approximate number of bytes sent to a worker
+                       at once
+    :rtype: an iterator over ``(start, end, padya)`` tuples in file
+            order, where `start` and `end` are the byte offsets of the
+            block and `padya` is a `Padya` or ``None``
+    """
+    jobs = jobs or multiprocessing.cpu_count()
+    with MappedCorpus(path) as corpus:
+        ranges = corpus.ranges(range_size)
+        if jobs == 1:
+            meter_ids = _make_meter_ids(classifier)
+            results = (_classify_range(classifier, meter_ids, corpus, i, j)
+                       for i, j in ranges)
+        else:
+            pool = multiprocessing.Pool(jobs, _init_worker, (classifier,))
+            tasks = ((path, i, j) for i, j in ranges)
+            results = _iter_pool_results(pool, tasks, 2 * jobs, _work_range)
+
+        padyas = meters(classifier)
+        for chunk in results:
+            for start, end, meter_id in chunk:
+                if meter_id is None:
+                    yield start, end, None
+                else:
+                    yield start, end, padyas[meter_id]
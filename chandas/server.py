@@ -0,0 +1,414 @@
+# -*- coding: utf-8 -*-
+"""
+    chandas.server
+    ~~~~~~~~~~~~~~
+
+    A small HTTP server that classifies verses sent as JSON.
+
+    The catalog is loaded once, and verses from concurrent requests are
+    classified together in batches. Run it with::
+
+        python -m chandas.server --catalog data/data.json --port 8000
+
+    :license: MIT
+"""
+
+import argparse
+import json
+import multiprocessing
+import threading
+from timeit import default_timer
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from queue import Empty, Queue
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from Queue import Empty, Queue
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+
+from . import parallel
+from .classify import Classifier
+from .metrics import Histogram, Metrics
+
+try:
+    _string_types = basestring
+except NameError:
+    # Python 3
+    _string_types = str
+
+
+class Batcher(object):
+
+    """Collects verses from many threads and classifies them together.
+
+    A background thread takes the first waiting request, then waits up
+    to `max_wait` seconds for more until it has `max_batch` verses. All
+    of the verses are classified in one call, and each request gets its
+    own results back. If that call fails, each request in the batch is
+    classified on its own, so that only the requests that fail get an
+    error.
+
+    :param classify_many: a function that takes a list of raw verses
+                          and returns a list of `Padya` or ``None``
+    :param max_batch: the most verses to collect into one batch
+    :param max_wait: the longest time to wait for a batch to fill
+    """
+
+    def __init__(self, classify_many, max_batch=64, max_wait=0.002):
+        #: The most verses to collect into one batch.
+        self.max_batch = max_batch
+
+        #: The longest time to wait for a batch to fill, in seconds.
+        self.max_wait = max_wait
+
+        #: The number of batches classified.
+        self.batches = 0
+
+        #: The number of verses in each batch.
+        self.batch_sizes = Histogram((1, 2, 4, 8, 16, 32, 64, 128, 256))
+
+        self._classify_many = classify_many
+        self._queue = Queue()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, raws):
+        """Classify some verses, waiting until their batch is done.
+
+        :param raws: a list of raw verses
+        :rtype: a list of `Padya` or ``None``
+        """
+        if not raws:
+            return []
+        request = _Request(raws)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.results
+
+    def close(self):
+        """Stop the background thread once the waiting requests are
+        done."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        queue = self._queue
+        running = True
+        while running:
+            request = queue.get()
+            if request is None:
+                return
+            batch = [request]
+            size = len(request.raws)
+            deadline = default_timer() + self.max_wait
+            while size < self.max_batch:
+                timeout = deadline - default_timer()
+                if timeout <= 0:
+                    break
+                try:
+                    request = queue.get(timeout=timeout)
+                except Empty:
+                    break
+                if request is None:
+                    running = False
+                    break
+                batch.append(request)
+                size += len(request.raws)
+            self._classify(batch, size)
+
+    def _classify(self, batch, size):
+        self.batches += 1
+        self.batch_sizes.observe(size)
+        try:
+            results = self._classify_many([raw for request in batch
+                                           for raw in request.raws])
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0].error = e
+                batch[0].done.set()
+            else:
+                for request in batch:
+                    self._classify([request], len(request.raws))
+            return
+
+        start = 0
+        for request in batch:
+            end = start + len(request.raws)
+            request.results = results[start:end]
+            request.done.set()
+            start = end
+
+
+class _Request(object):
+
+    __slots__ = ('raws', 'results', 'error', 'done')
+
+    def __init__(self, raws):
+        self.raws = raws
+        self.results = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class ClassifierServer(ThreadingMixIn, HTTPServer):
+
+    """Serves a `Classifier` over HTTP.
+
+    Each request runs on its own thread. Verses are classified in
+    batches by a `Batcher`, either in this process or, if `jobs` is
+    more than 1, on a pool of worker processes that each load the
+    classifier once.
+
+    Endpoints:
+
+    - ``POST /classify`` with ``{"text": ...}`` returns
+      ``{"meter": ...}``, where the meter is a name or ``null``
+    - ``POST /classify_many`` with ``{"texts": [...]}`` returns
+      ``{"meters": [...]}``
+    - ``POST /classify_lines`` with ``{"text": ...}`` returns
+      ``{"lines": [{"text": ..., "meter": ...}, ...]}``. If
+      ``"all_candidates"`` is true, each line has ``"candidates"``, a
+      list of ``{"meter": ..., "padas": [...]}``, instead of a meter.
+    - ``GET /health`` returns ``{"status": "ok", ...}``
+    - ``GET /metrics`` returns the server's `Metrics` as JSON, or in
+      the Prometheus text format with ``?format=prometheus``
+
+    :param address: a ``(host, port)`` pair. Use port 0 to pick any
+                    free port.
+    :param classifier: a `Classifier`
+    :param jobs: the number of worker processes
+    :param max_batch: see `Batcher`
+    :param max_wait: see `Batcher`
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, classifier, jobs=1, max_batch=64,
+                 max_wait=0.002):
+        HTTPServer.__init__(self, address, _Handler)
+
+        #: The served `Classifier`.
+        self.classifier = classifier
+
+        #: The results of every classified verse and line. Verses are
+        #: classified in batches, so only `classify_lines` is timed.
+        self.metrics = Metrics(stages=('lines',))
+
+        #: The number of requests handled, by path.
+        self.requests = {}
+
+        self._lock = threading.Lock()
+        self._meters = parallel.meters(classifier)
+        if jobs > 1:
+            self._pool = multiprocessing.Pool(jobs, parallel._init_worker,
+                                              (classifier,))
+        else:
+            self._pool = None
+        self._jobs = jobs
+
+        #: The `Batcher` that classifies verses.
+        self.batcher = Batcher(self._classify_many, max_batch, max_wait)
+
+    def server_close(self):
+        HTTPServer.server_close(self)
+        self.batcher.close()
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+
+    def classify_many(self, raws):
+        """Classify some verses in the next batch and count the results.
+
+        :param raws: a list of raw verses
+        :rtype: a list of `Padya` or ``None``
+        """
+        padyas = self.batcher.submit(raws)
+        with self._lock:
+            for padya in padyas:
+                self.metrics.record(padya)
+        return padyas
+
+    def classify_lines(self, raw, all_candidates=False):
+        """Classify the lines in some verse and count them.
+
+        :param raw: a raw verse
+        :param all_candidates: see `Classifier.classify_lines`
+        """
+        start = default_timer()
+        padas = self.classifier.classify_lines(raw, all_candidates)
+        seconds = default_timer() - start
+        with self._lock:
+            self.metrics.lines += len(padas)
+            self.metrics.stages['lines'].observe(seconds)
+        return padas
+
+    def _classify_many(self, raws):
+        if self._pool is None:
+            return self.classifier.classify_many(raws)
+
+        # Split the batch evenly across the workers.
+        size = -(-len(raws) // self._jobs)
+        chunks = [(i, raws[i:i + size]) for i in range(0, len(raws), size)]
+        returned = []
+        for start, meter_ids in self._pool.map(parallel._work, chunks):
+            returned.extend(None if i is None else self._meters[i]
+                            for i in meter_ids)
+        return returned
+
+    def _count_request(self, path):
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        server = self.server
+        server._count_request(url.path)
+        if url.path == '/health':
+            self._send_json({
+                'status': 'ok',
+                'vrttas': len(server.classifier.vrttas),
+                'jatis': len(server.classifier.jatis),
+            })
+        elif url.path == '/metrics':
+            if parse_qs(url.query).get('format') == ['prometheus']:
+                with server._lock:
+                    text = server.metrics.to_prometheus()
+                self._send(200, text.encode('utf-8'),
+                           'text/plain; version=0.0.4')
+            else:
+                with server._lock:
+                    data = server.metrics.to_dict()
+                    data['requests'] = dict(server.requests)
+                data['batches'] = server.batcher.batches
+                data['batch_sizes'] = server.batcher.batch_sizes.to_dict()
+                self._send_json(data)
+        else:
+            self._send_json({'error': 'not found'}, 404)
+
+    def do_POST(self):
+        server = self.server
+        path = urlparse(self.path).path
+        server._count_request(path)
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            data = json.loads(self.rfile.read(length).decode('utf-8'))
+        except ValueError:
+            self._send_json({'error': 'invalid JSON'}, 400)
+            return
+
+        try:
+            if path == '/classify':
+                raws = [_text(data['text'])]
+            elif path == '/classify_many':
+                texts = data['texts']
+                if not isinstance(texts, list):
+                    raise TypeError(texts)
+                raws = [_text(x) for x in texts]
+            elif path == '/classify_lines':
+                raw = _text(data['text'])
+                all_candidates = bool(data.get('all_candidates'))
+            else:
+                self._send_json({'error': 'not found'}, 404)
+                return
+        except (KeyError, TypeError, AttributeError):
+            self._send_json({'error': 'invalid request'}, 400)
+            return
+
+        # The request is valid, so any error from here on is ours.
+        try:
+            if path == '/classify_lines':
+                body = {'lines': self._classify_lines(raw, all_candidates)}
+            else:
+                padyas = server.classify_many(raws)
+                if path == '/classify':
+                    body = {'meter': _name(padyas[0])}
+                else:
+                    body = {'meters': [_name(p) for p in padyas]}
+        except Exception:
+            self._send_json({'error': 'internal error'}, 500)
+            return
+        self._send_json(body)
+
+    def _classify_lines(self, raw, all_candidates):
+        returned = []
+        for line, match in self.server.classify_lines(raw, all_candidates):
+            if all_candidates:
+                candidates = [{'meter': vrtta.name, 'padas': list(padas)}
+                              for vrtta, padas in match]
+                returned.append({'text': line.raw, 'candidates': candidates})
+            else:
+                returned.append({'text': line.raw, 'meter': _name(match)})
+        return returned
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self._send(status, body, 'application/json; charset=utf-8')
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _name(padya):
+    return None if padya is None else padya.name
+
+
+def _text(value):
+    """Return `value` if it is a string, so that a bad request fails
+    before its verses join a batch."""
+    if not isinstance(value, _string_types):
+        raise TypeError(value)
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Serve a chandas classifier over HTTP.')
+    parser.add_argument('--catalog', default='data/data.json',
+                        help='the JSON catalog of meters')
+    parser.add_argument('--snapshot',
+                        help='a snapshot of the catalog, rebuilt as needed')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='the number of worker processes')
+    parser.add_argument('--max-batch', type=int, default=64,
+                        help='the most verses to classify at once')
+    parser.add_argument('--max-wait', type=float, default=0.002,
+                        help='the longest time to wait for a batch, '
+                             'in seconds')
+    args = parser.parse_args(argv)
+
+    if args.snapshot:
+        classifier = Classifier.from_snapshot(args.snapshot, args.catalog)
+    else:
+        classifier = Classifier.from_json_file(args.catalog)
+    server = ClassifierServer((args.host, args.port), classifier, args.jobs,
+                              args.max_batch, args.max_wait)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+    chandas.vectorized
+    ~~~~~~~~~~~~~~~~~~
+
+    Batch classification with NumPy, for large offline jobs.
+
+    This module needs NumPy, which the rest of the package does not.
+
+    :license: MIT
+"""
+
+import numpy as np
+
+from .enums import Weights
+from .wrappers import Block
+
+
+class VectorClassifier(object):
+
+    """Wraps a `Classifier` and matches whole batches with array code.
+
+    Scans of the same length are stacked into a ``uint8`` matrix with
+    one row per verse and one bit per syllable, where guru is 1. Each
+    vṛtta of that length is a ``(mask, value)`` pair in the same
+    layout, where `mask` clears the bits of its wildcards. A verse
+    matches a vṛtta if ``(scan ^ value) & mask`` is zero, which is
+    computed for every verse and vṛtta at once.
+
+    *Jātis* are matched in the same batch: the running *mātrā* totals
+    of every verse come from a single `cumsum`, and each *jāti* is then
+    a lookup of its pāda boundaries in those totals.
+
+    The results are the same as those of `Classifier.classify_many`.
+
+    Verses are matched `max_rows` at a time, so the arrays stay small
+    however many verses there are.
+
+    :param classifier: a `Classifier`
+    :param max_rows: the most verses to match at once
+    """
+
+    def __init__(self, classifier, max_rows=1 << 16):
+        #: The wrapped `Classifier`.
+        self.classifier = classifier
+
+        #: The most verses to match at once.
+        self.max_rows = max_rows
+
+        # Maps a syllable count to the indices of the vṛttas with that
+        # many syllables, in catalog order, and their packed masks and
+        # values.
+        self._vrttas = {}
+        by_length = {}
+        for i, vrtta in enumerate(classifier.vrttas):
+            by_length.setdefault(len(vrtta.verse_pattern), []).append(i)
+        for length, indices in by_length.items():
+            patterns = _encode([classifier.vrttas[i].verse_pattern
+                                for i in indices], length)
+            values = np.packbits(patterns == ord(Weights.GURU), axis=1)
+            masks = np.packbits(patterns != ord(Weights.EITHER), axis=1)
+            self._vrttas[length] = (np.array(indices), masks, values)
+
+        # Every way of dividing a verse into pādas, for every jāti in
+        # catalog order. `_jati_required[k]` holds the running totals
+        # that must occur in the verse, and `_jati_ends[k]` the totals
+        # that the verse may have.
+        required = []
+        ends = []
+        owners = []
+        for i, jati in enumerate(classifier.jatis):
+            for jati_required, jati_ends in jati.boundaries:
+                required.append(jati_required)
+                ends.append(jati_ends)
+                owners.append(i)
+        self._jati_required = np.array(required, dtype=np.intp).reshape(-1, 3)
+        self._jati_ends = np.array(ends, dtype=np.intp).reshape(-1, 2)
+        self._jati_owners = np.array(owners, dtype=np.intp)
+
+    def classify_many(self, data):
+        """Identify the meter of many inputs at once.
+
+        :param data: an iterable of input strings or `Block` objects,
+                     e.g. the output of `iter_blocks`
+        :rtype: a list of `Padya` or ``None``, in input order
+        """
+        scans = []
+        for datum in data:
+            if not isinstance(datum, Block):
+                datum = Block(datum)
+            scans.append(''.join(datum.scan))
+        return self.classify_scans(scans)
+
+    def classify_scans(self, scans):
+        """Identify the meter of many verse scans at once.
+
+        :param scans: a list of scans, as returned by `Block.scan` and
+                      joined into one string
+        :rtype: a list of `Padya` or ``None``, in input order
+        """
+        by_length = {}
+        for i, scan in enumerate(scans):
+            by_length.setdefault(len(scan), []).append(i)
+
+        returned = [None] * len(scans)
+        max_rows = self.max_rows
+        for length, rows in by_length.items():
+            for start in range(0, len(rows), max_rows):
+                chunk = rows[start:start + max_rows]
+                group = _encode([scans[i] for i in chunk], length)
+                for i, padya in zip(chunk, self._classify_group(group)):
+                    returned[i] = padya
+        return returned
+
+    def _classify_group(self, group):
+        """Classify an encoded batch of scans of the same length.
+
+        :param group: a ``uint8`` matrix from `_encode`
+        :rtype: a list of `Padya` or ``None``, one per row
+        """
+        classifier = self.classifier
+        num_rows, length = group.shape
+        gurus = group == ord(Weights.GURU)
+        returned = [None] * num_rows
+
+        # Vṛtta
+        unmatched = np.ones(num_rows, dtype=bool)
+        if length in self._vrttas:
+            indices, masks, values = self._vrttas[length]
+            packed = np.packbits(gurus, axis=1)
+            mismatch = (packed[:, None, :] ^ values[None]) & masks[None]
+            matches = ~mismatch.any(axis=2)
+            found = matches.any(axis=1)
+            first = indices[matches.argmax(axis=1)]
+            for row in np.flatnonzero(found):
+                returned[row] = classifier.vrttas[first[row]]
+            unmatched = ~found
+
+        # Jāti
+        rows = np.flatnonzero(unmatched)
+        if not len(rows) or not len(self._jati_owners):
+            return returned
+
+        # `totals[r, i]` is the mātrā length of the first `i` syllables
+        # of row `r`, and `seen[r, t]` is set if some prefix of row `r`
+        # is `t` mātrās long.
+        weights = gurus[rows].astype(np.intp) + 1
+        totals = np.zeros((len(rows), length + 1), dtype=np.intp)
+        np.cumsum(weights, axis=1, out=totals[:, 1:])
+        width = max(2 * length, self._jati_required.max()) + 1
+        seen = np.zeros((len(rows), width), dtype=bool)
+        seen[np.arange(len(rows))[:, None], totals] = True
+
+        ok = seen[:, self._jati_required].all(axis=2)
+        ok &= (totals[:, -1, None, None] == self._jati_ends[None]).any(axis=2)
+        found = ok.any(axis=1)
+        first = self._jati_owners[ok.argmax(axis=1)]
+        for i in np.flatnonzero(found):
+            returned[rows[i]] = classifier.jatis[first[i]]
+        return returned
+
+
+def _encode(scans, length):
+    """Return some scans of the same length as a ``uint8`` matrix.
+
+    :param scans: a list of strings, each `length` characters long
+    :param length: the length of each scan
+    """
+    data = ''.join(scans).encode('ascii')
+    return np.frombuffer(data, dtype=np.uint8).reshape(len(scans), length)
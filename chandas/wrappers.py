@@ -8,10 +8,248 @@
     :license: MIT and BSD
 """
 
+import io
+import mmap
 import re
+from collections import OrderedDict
 
 from .enums import SLP, Weights
 
+try:
+    from sys import intern
+except ImportError:
+    # Python 2, where `intern` is a builtin
+    pass
+
+
+# Character classes used by `scan_text`. Characters that aren't listed
+# are ignored. The *anusvāra* and *visarga* close a syllable just like
+# consonants do.
+_SHORT_VOWEL, _LONG_VOWEL, _CONSONANT = range(3)
+_CHAR_CLASSES = {}
+for _chars, _cls in ((SLP.SHORT_VOWELS, _SHORT_VOWEL),
+                     (SLP.LONG_VOWELS, _LONG_VOWEL),
+                     (SLP.CONSONANTS + 'MH', _CONSONANT)):
+    for _char in _chars:
+        _CHAR_CLASSES[_char] = _cls
+
+
+def scan_text(raw):
+    """Return the metrical scan of some raw text.
+
+    This makes a single pass over `raw`. Each vowel starts a syllable,
+    and its weight is decided by the consonants that follow it:
+
+    - long vowels are always guru
+    - short vowels are guru if followed by two or more consonants
+    - a final short vowel is guru if followed by any consonant
+
+    Consonants before the first vowel and non-SLP1 characters are
+    ignored.
+
+    :param raw: some SLP1 text
+    """
+    classes = _CHAR_CLASSES
+    weights = []
+    # The class of the vowel whose weight is pending, and the number of
+    # consonants seen after it.
+    vowel = None
+    run = 0
+    for char in raw:
+        cls = classes.get(char)
+        if cls == _CONSONANT:
+            run += 1
+        elif cls is not None:
+            if vowel is not None:
+                if vowel == _LONG_VOWEL or run > 1:
+                    weights.append(Weights.GURU)
+                else:
+                    weights.append(Weights.LAGHU)
+            vowel = cls
+            run = 0
+    if vowel is not None:
+        if vowel == _LONG_VOWEL or run:
+            weights.append(Weights.GURU)
+        else:
+            weights.append(Weights.LAGHU)
+    return ''.join(weights)
+
+
+def scan_offsets(raw):
+    """Return the metrical scan of some raw text and where each syllable
+    is.
+
+    The scan is the same as `scan_text`. Each syllable starts at the
+    first consonant before its vowel in the same word, and ends after
+    its vowel and any *anusvāra* or *visarga*. If the vowel is followed
+    by consonants that end the word, they end the syllable instead.
+
+    :param raw: some SLP1 text
+    :rtype: a tuple of the scan, the offset of the start of each
+            syllable, and the offset of the end of each syllable
+    """
+    classes = _CHAR_CLASSES
+    weights = []
+    starts = []
+    ends = []
+
+    vowel = None
+    run = 0
+    # The start of the current run of consonants in this word.
+    onset = None
+    # Whether the end of the last syllable is still open, and where it
+    # ends if the next letter is a vowel (`vowel_end`) or if the word
+    # ends first (`word_end`).
+    open_end = False
+    vowel_end = word_end = None
+    for i, char in enumerate(raw):
+        cls = classes.get(char)
+        if cls == _CONSONANT:
+            run += 1
+            if open_end:
+                if vowel_end == i and char in 'MH':
+                    vowel_end = i + 1
+                word_end = i + 1
+            if onset is None and char not in 'MH':
+                onset = i
+        elif cls is not None:
+            if vowel is not None:
+                if vowel == _LONG_VOWEL or run > 1:
+                    weights.append(Weights.GURU)
+                else:
+                    weights.append(Weights.LAGHU)
+            if open_end:
+                ends.append(vowel_end)
+            starts.append(i if onset is None else onset)
+            vowel = cls
+            run = 0
+            onset = None
+            open_end = True
+            vowel_end = word_end = i + 1
+        else:
+            onset = None
+            if open_end:
+                ends.append(word_end)
+                open_end = False
+    if vowel is not None:
+        if vowel == _LONG_VOWEL or run:
+            weights.append(Weights.GURU)
+        else:
+            weights.append(Weights.LAGHU)
+    if open_end:
+        ends.append(word_end)
+    return ''.join(weights), starts, ends
+
+
+def scan_to_gana(scan):
+    """Return the gaṇas that compose some scan.
+
+    See `Line.gana` for the format of the result.
+
+    :param scan: a string of syllable weights
+    """
+    converter = Weights.GANAS
+    gana = []
+    n = 3
+    for i in range(0, len(scan), n):
+        triple = scan[i:i+n]
+        # Hit: gana found
+        # Miss: < 3 syllables, just append
+        try:
+            gana.append(converter[triple])
+        except KeyError:
+            gana.append(triple.lower())
+
+    return ''.join(gana)
+
+
+class LineCache(object):
+
+    """A size-bounded LRU cache of line scans.
+
+    Entries are keyed by the clean text of a line, and each one holds
+    the line's scan, syllables and whether it starts with a conjunct.
+    Lines look themselves up in the process-wide cache, if one has been
+    set with `enable_line_cache`.
+    """
+
+    def __init__(self, capacity=10000):
+        #: The maximum number of entries.
+        self.capacity = capacity
+
+        #: The number of lookups that found an entry.
+        self.hits = 0
+
+        #: The number of lookups that didn't find an entry.
+        self.misses = 0
+
+        #: The number of entries dropped to stay within `capacity`.
+        self.evictions = 0
+
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, clean):
+        """Return the entry for some clean text, or ``None``.
+
+        :param clean: the clean text of a line
+        """
+        try:
+            entry = self._entries.pop(clean)
+        except KeyError:
+            self.misses += 1
+            return None
+        self._entries[clean] = entry
+        self.hits += 1
+        return entry
+
+    def put(self, clean, entry):
+        """Add an entry, evicting the least recently used one if full.
+
+        :param clean: the clean text of a line
+        :param entry: a tuple of the scan, the syllables, and whether
+                      the line starts with a conjunct
+        """
+        entries = self._entries
+        entries.pop(clean, None)
+        entries[clean] = entry
+        while len(entries) > self.capacity:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Remove all entries and reset all counters."""
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+
+#: The process-wide `LineCache`, or ``None`` if caching is disabled.
+_line_cache = None
+
+
+def enable_line_cache(capacity=10000):
+    """Start caching line scans across the whole process.
+
+    :param capacity: the maximum number of lines to cache
+    :rtype: the new `LineCache`
+    """
+    global _line_cache
+    _line_cache = LineCache(capacity)
+    return _line_cache
+
+
+def disable_line_cache():
+    """Stop caching line scans."""
+    global _line_cache
+    _line_cache = None
+
+
+def get_line_cache():
+    """Return the process-wide `LineCache`, or ``None``."""
+    return _line_cache
+
 
 class Line(object):
 
@@ -19,8 +257,15 @@ class Line(object):
 
     This automatically cleans the raw input and makes sure that all of
     the line-related functions are using the right input.
+
+    Lines are immutable. The scan, syllables and conjunct flag are each
+    computed once, on first use, and scans are interned so that equal
+    scans share memory.
     """
 
+    __slots__ = ('_raw', '_clean', '_scan', '_syllables',
+                 '_starts_with_conjunct')
+
     def __init__(self, raw=None, **kw):
         self._raw = raw.strip()
 
@@ -52,19 +297,7 @@ class Line(object):
         a gaṇa. The full alphabet used is ``'ymtrjBnslg'``, where ``'l'``
         denotes laghu and ``'g'`` denotes guru.
         """
-        converter = Weights.GANAS
-        gana = []
-        n = 3
-        for i in xrange(0, len(self.scan), n):
-            triple = self.scan[i:i+n]
-            # Hit: gana found
-            # Miss: < 3 syllables, just append
-            try:
-                gana.append(converter[triple])
-            except KeyError:
-                gana.append(triple.lower())
-
-        return ''.join(gana)
+        return scan_to_gana(self.scan)
 
     @property
     def matra_count(self):
@@ -87,34 +320,23 @@ class Line(object):
         try:
             return self._scan
         except AttributeError:
-            pass
-
-        cons = SLP.CONSONANTS
-        short_v = SLP.SHORT_VOWELS
-        long_v = SLP.LONG_VOWELS
-        vowel = SLP.VOWELS
-        # Remove extra initial consonants (edge case)
-        data = re.sub('^[%s]+' % cons, '', self.clean)
-        # Handle final consonants (edge case)
-        data = re.sub('[%s][MH%s]+$' % (vowel, cons), '_', data)
-        # Long vowels
-        data = re.sub('[%s][%sMH]*' % (long_v, cons), '_', data)
-        # Short vowels with anusvara/visarga/conjunct
-        data = re.sub('[%s]([MH]|[%s]){2,}' % (short_v, cons), '_', data)
-        # Short vowels without conjunct
-        data = re.sub('[%s][%s]*' % (short_v, cons), '.', data)
-        # Remove any lingering characters (for malformed strings)
-        data = re.sub('[^_.]', '', data)
-        # Convert to normal symbols
-        data = data.replace('_', Weights.GURU).replace('.', Weights.LAGHU)
-
-        self._scan = data
-        return data
+            if _line_cache is None:
+                self._scan = intern(scan_text(self.raw))
+            else:
+                self._load_cached()
+            return self._scan
 
     @property
     def starts_with_conjunct(self):
         """Return whether the line starts with a consonant cluster."""
-        return re.match('[%s]{2,}' % SLP.CONSONANTS, self.clean)
+        try:
+            return self._starts_with_conjunct
+        except AttributeError:
+            if _line_cache is None:
+                self._starts_with_conjunct = self._find_conjunct()
+            else:
+                self._load_cached()
+            return self._starts_with_conjunct
 
     @property
     def syllables(self):
@@ -127,16 +349,40 @@ class Line(object):
         - the *anusvāra*
         - a consonant (last syllable only)
         """
+        try:
+            return list(self._syllables)
+        except AttributeError:
+            if _line_cache is None:
+                self._syllables = tuple(self._split_syllables())
+            else:
+                self._load_cached()
+            return list(self._syllables)
+
+    def _find_conjunct(self):
+        return bool(re.match('[%s]{2,}' % SLP.CONSONANTS, self.clean))
+
+    def _split_syllables(self):
         items = re.findall('.*?[%s][MH]?' % SLP.VOWELS, self.clean)
 
         # Handle final consonants (edge case)
         tail = re.search('([%s]+$)' % SLP.CONSONANTS, self.clean)
         if items and tail:
             items[-1] += tail.group(1)
-
-        self._syllables = items
         return items
 
+    def _load_cached(self):
+        """Set the scan, syllables and conjunct flag from the line cache.
+
+        On a miss, all three are computed and added to the cache.
+        """
+        clean = self.clean
+        entry = _line_cache.get(clean)
+        if entry is None:
+            entry = (intern(scan_text(clean)), tuple(self._split_syllables()),
+                     self._find_conjunct())
+            _line_cache.put(clean, entry)
+        self._scan, self._syllables, self._starts_with_conjunct = entry
+
 
 class Block(object):
 
@@ -144,44 +390,312 @@ class Block(object):
 
     This automatically cleans the raw input and makes sure that the
     other code in the package is using clean input.
+
+    Blocks are immutable. The scan and syllables are each computed
+    once, on first use.
     """
 
-    def __init__(self, raw):
-        #: The raw input.
-        self.raw = raw
+    __slots__ = ('_raw', '_lines', '_line_number', '_offset', '_end_offset',
+                 '_scan', '_syllables')
+
+    def __init__(self, raw, line_number=None, offset=None, end_offset=None):
+        self._raw = raw
+        self._lines = tuple(Line(x) for x in raw.strip().splitlines() if x)
+        self._line_number = line_number
+        self._offset = offset
+        self._end_offset = end_offset
+
+    @property
+    def raw(self):
+        """Return the raw input."""
+        return self._raw
+
+    @property
+    def lines(self):
+        """Return a tuple of `Line` objects."""
+        return self._lines
 
-        #: A list of `Line` objects.
-        self.lines = [Line(x) for x in raw.strip().splitlines() if x]
+    @property
+    def line_number(self):
+        """Return the number of the block's first line in its source,
+        counting from 1, or ``None`` if unknown."""
+        return self._line_number
+
+    @property
+    def offset(self):
+        """Return the offset of the block's start in its source, or
+        ``None`` if unknown."""
+        return self._offset
+
+    @property
+    def end_offset(self):
+        """Return the offset of the block's end in its source, or
+        ``None`` if unknown."""
+        return self._end_offset
 
     @property
     def scan(self):
-        """Return the metrical scan of the blcok.
+        """Return the metrical scan of the block.
 
         Pāda-final laghu is scanned as guru if the pāda is odd and the
         next line starts with a conjunct. If the pāda is even, the laghu
         is left as-is.
         """
-        returned = []
-        for i, x in enumerate(self.lines):
-            try:
-                next_is_conjunct = self.lines[i + 1].starts_with_conjunct
-            except IndexError:
-                next_is_conjunct = False
-
-            odd_pada = i % 2 == 0
-            if odd_pada and x.ends_with_laghu and next_is_conjunct:
-                returned.append(x.scan[:-1] + Weights.GURU)
-            else:
-                returned.append(x.scan)
+        try:
+            return list(self._scan)
+        except AttributeError:
+            pass
 
+        lines = self._lines
+        returned = [_block_line_scan(lines, i) for i in range(len(lines))]
+        self._scan = tuple(returned)
         return returned
 
     @property
     def syllables(self):
-        return [s for line in self.lines for s in line.syllables]
+        try:
+            return list(self._syllables)
+        except AttributeError:
+            self._syllables = tuple(s for line in self._lines
+                                    for s in line.syllables)
+            return list(self._syllables)
+
+    def replace_line(self, i, raw):
+        """Return a copy of the block with one line replaced.
+
+        The other lines are shared with this block, so only the new line
+        is scanned. If this block's scan was already computed, the new
+        block's scan is updated in place of being recomputed: only the
+        new line and the line before it, whose final syllable depends on
+        how the new line starts, are scanned again.
+
+        The new block's `raw` is its lines joined by newlines, and its
+        offsets are unknown. Since a block never has empty lines, `raw`
+        must be one line that isn't blank, or this raises `ValueError`.
+
+        :param i: the index of the line to replace
+        :param raw: the raw text of the new line
+        """
+        if len(raw.strip().splitlines()) != 1:
+            raise ValueError('%r is not a single non-empty line' % raw)
+        lines = list(self._lines)
+        lines[i] = Line(raw)
+        lines = tuple(lines)
+
+        returned = Block.__new__(Block)
+        returned._raw = '\n'.join(x.raw for x in lines)
+        returned._lines = lines
+        returned._line_number = self._line_number
+        returned._offset = returned._end_offset = None
+        try:
+            scan = list(self._scan)
+        except AttributeError:
+            return returned
+
+        i %= len(lines)
+        for j in (i - 1, i):
+            if j >= 0:
+                scan[j] = _block_line_scan(lines, j)
+        returned._scan = tuple(scan)
+        return returned
+
+
+def _block_line_scan(lines, i):
+    """Return the scan of line `i` within a block. See `Block.scan`.
+
+    :param lines: the block's `Line` objects
+    :param i: the index of a line
+    """
+    x = lines[i]
+    try:
+        next_is_conjunct = lines[i + 1].starts_with_conjunct
+    except IndexError:
+        next_is_conjunct = False
+
+    odd_pada = i % 2 == 0
+    if odd_pada and x.ends_with_laghu and next_is_conjunct:
+        return intern(x.scan[:-1] + Weights.GURU)
+    return x.scan
 
 
 def iter_blocks(raw):
     """Iterator over the block in some raw input."""
     for blob in re.split(r'\n\s*\n', raw):
         yield Block(blob)
+
+
+def iter_file_blocks(source, buffer_size=io.DEFAULT_BUFFER_SIZE,
+                     encoding='utf-8'):
+    """Iterator over the blocks in some file, without reading all of it.
+
+    The file is read in chunks of `buffer_size`, and each block is
+    yielded as soon as the blank line after it is read, so memory use
+    depends only on the size of the largest block. Unlike `iter_blocks`,
+    this never yields empty blocks.
+
+    Each block has its `line_number`, `offset` and `end_offset` set. If
+    the file is read as bytes, offsets count bytes.
+
+    :param source: a path or a file object
+    :param buffer_size: the size of each read, if `source` is a path
+    :param encoding: the encoding used to decode bytes
+    """
+    if hasattr(source, 'read'):
+        f = source
+    else:
+        f = io.open(source, 'rb', buffering=buffer_size)
+
+    try:
+        lines = []
+        line_number = offset = end_offset = None
+        position = 0
+        for i, line in enumerate(f, 1):
+            length = len(line)
+            if isinstance(line, bytes):
+                line = line.decode(encoding)
+
+            if line.strip():
+                if not lines:
+                    line_number = i
+                    offset = position
+                lines.append(line)
+                content = line.rstrip('\r\n')
+                end_offset = position + length - (len(line) - len(content))
+            elif lines:
+                raw = ''.join(lines)
+                yield Block(raw.rstrip('\r\n'), line_number, offset,
+                            end_offset)
+                lines = []
+            position += length
+
+        if lines:
+            raw = ''.join(lines)
+            yield Block(raw.rstrip('\r\n'), line_number, offset, end_offset)
+    finally:
+        if f is not source:
+            f.close()
+
+
+class MappedCorpus(object):
+
+    """A large corpus file that is memory-mapped instead of read.
+
+    Block boundaries are found directly in the mapped bytes, so finding
+    a block costs no copy or decode. A block's text is decoded only when
+    `block` is called for its span, and pages that are never touched are
+    never read.
+
+    Blocks are separated by blank lines, as in `iter_file_blocks`, but
+    only ASCII whitespace counts as blank. Spans are byte offsets, where
+    the end excludes the block's final line break.
+
+    When pickled, a corpus keeps only its path, so sending one to a
+    worker process is cheap. The worker maps the same file, and the
+    operating system shares the pages between processes.
+
+    :param path: the path to the file
+    :param encoding: the encoding used to decode blocks
+    """
+
+    #: Matches a block: a maximal run of lines that aren't blank.
+    BLOCK_RE = re.compile(br'(?m)^[^\n]*\S[^\n]*(?:\n[^\n]*\S[^\n]*)*')
+
+    #: Matches the blank lines between two blocks.
+    SEPARATOR_RE = re.compile(br'\n[^\S\n]*\n')
+
+    def __init__(self, path, encoding='utf-8'):
+        #: The path to the file.
+        self.path = path
+
+        #: The encoding used to decode blocks.
+        self.encoding = encoding
+
+        self._open()
+
+    def _open(self):
+        with io.open(self.path, 'rb') as f:
+            try:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files can't be mapped.
+                self._map = b''
+
+    def __getstate__(self):
+        return {'path': self.path, 'encoding': self.encoding}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._map)
+
+    def close(self):
+        """Unmap the file."""
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+
+    def spans(self, start=0, end=None):
+        """Iterate over the spans of the blocks that start in some range.
+
+        `start` must be the start of a line.
+
+        :param start: the first offset to search
+        :param end: the offset after the last block start, or ``None``
+                    for the end of the file
+        :rtype: an iterator over ``(start, end)`` pairs
+        """
+        data = self._map
+        if end is None:
+            end = len(data)
+        for match in self.BLOCK_RE.finditer(data, start):
+            i, j = match.span()
+            if i >= end:
+                return
+            while data[j - 1:j] == b'\r':
+                j -= 1
+            yield i, j
+
+    def block(self, start, end):
+        """Return the block in some span, as a `Block`.
+
+        :param start: the offset of the block's start
+        :param end: the offset of the block's end
+        """
+        raw = self._map[start:end].decode(self.encoding)
+        return Block(raw, offset=start, end_offset=end)
+
+    def blocks(self, start=0, end=None):
+        """Iterate over the blocks that start in some range.
+
+        See `spans` for the meaning of `start` and `end`.
+        """
+        for i, j in self.spans(start, end):
+            yield self.block(i, j)
+
+    def ranges(self, size):
+        """Divide the file into ranges of about `size` bytes.
+
+        Each range starts and ends between two blocks, so that every
+        block starts in exactly one range. Ranges can be passed to
+        `spans` or `blocks`, e.g. by different workers.
+
+        :param size: the approximate size of each range
+        :rtype: a list of ``(start, end)`` pairs that cover the file
+        """
+        data = self._map
+        length = len(data)
+        returned = []
+        start = 0
+        while start < length:
+            match = self.SEPARATOR_RE.search(data, start + size)
+            end = match.end() if match else length
+            returned.append((start, end))
+            start = end
+        return returned
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+import io
+import threading
+
+import pytest
+
+asyncio = pytest.importorskip('asyncio')
+
+from concurrent.futures import ThreadPoolExecutor
+
+from chandas.aio import AsyncClassifier
+from chandas.wrappers import iter_blocks
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+def _collect(loop, aiter):
+    """Run an async iterator to completion without `async for`."""
+    returned = []
+    it = aiter.__aiter__()
+    while True:
+        try:
+            returned.append(loop.run_until_complete(it.__anext__()))
+        except StopAsyncIteration:
+            return returned
+
+
+class _AsyncList(object):
+
+    def __init__(self, items):
+        self.items = list(items)
+        self.read = 0
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        future = asyncio.get_event_loop().create_future()
+        if self.read == len(self.items):
+            future.set_exception(StopAsyncIteration())
+        else:
+            future.set_result(self.items[self.read])
+            self.read += 1
+        return future
+
+
+class _ThreadRecordingFile(io.BytesIO):
+
+    def __init__(self, data):
+        io.BytesIO.__init__(self, data)
+        self.threads = set()
+
+    def __next__(self):
+        self.threads.add(threading.current_thread())
+        return io.BytesIO.__next__(self)
+
+
+def test_classify(full_classifier, loop):
+    a = AsyncClassifier(full_classifier)
+    raw = 'yenAmandamarande daladaravinde dinAnyanAyizata .\n' \
+          'kuwaje Kalu tenehA tenehA maDukareRa kaTam ..'
+    padya = loop.run_until_complete(a.classify(raw))
+    assert padya is full_classifier.classify(raw)
+
+
+def test_classify_many(full_classifier, corpus, loop):
+    expected = full_classifier.classify_many(iter_blocks(corpus))
+    with ThreadPoolExecutor(2) as executor:
+        a = AsyncClassifier(full_classifier, executor, batch_size=4)
+        assert loop.run_until_complete(a.classify_many(corpus)) == expected
+        assert loop.run_until_complete(a.classify_many([])) == []
+
+
+def test_classify_corpus(full_classifier, corpus, loop):
+    expected = full_classifier.classify_many(iter_blocks(corpus))
+    a = AsyncClassifier(full_classifier, batch_size=4, max_pending=2)
+    actual = _collect(loop, a.classify_corpus(iter_blocks(corpus)))
+    assert sorted(i for i, _ in actual) == list(range(15))
+    assert [p for _, p in sorted(actual, key=lambda x: x[0])] == expected
+
+
+def test_classify_corpus_file(full_classifier, corpus, loop):
+    expected = full_classifier.classify_many(iter_blocks(corpus))
+    a = AsyncClassifier(full_classifier, batch_size=4)
+    f = _ThreadRecordingFile(corpus.encode('utf-8'))
+    assert loop.run_until_complete(a.classify_many(f)) == expected
+    assert f.threads
+    assert threading.current_thread() not in f.threads
+
+
+def test_classify_corpus_async_input(full_classifier, corpus, loop):
+    expected = full_classifier.classify_many(iter_blocks(corpus))
+    a = AsyncClassifier(full_classifier, batch_size=4)
+    asyncio.set_event_loop(loop)
+    data = _AsyncList(iter_blocks(corpus))
+    actual = loop.run_until_complete(a.classify_many(data))
+    assert actual == expected
+
+
+def test_backpressure(full_classifier, corpus, loop):
+    a = AsyncClassifier(full_classifier, batch_size=1, max_pending=2)
+    asyncio.set_event_loop(loop)
+    data = _AsyncList(corpus.split('\n\n'))
+    it = a.classify_corpus(data).__aiter__()
+    loop.run_until_complete(it.__anext__())
+    # The first result needs at most `max_pending` batches in flight,
+    # plus the one being read.
+    assert data.read <= 3
+    loop.run_until_complete(it.aclose())
+
+
+def test_with_processes(full_classifier, corpus, loop):
+    expected = full_classifier.classify_many(iter_blocks(corpus))
+    a = AsyncClassifier.with_processes(full_classifier, jobs=2, batch_size=4)
+    try:
+        actual = loop.run_until_complete(a.classify_many(corpus))
+    finally:
+        a.close()
+    assert actual == expected
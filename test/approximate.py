@@ -0,0 +1,52 @@
+from chandas.approximate import ApproximateMatcher, align
+
+
+class TestApproximateMatcher(object):
+
+    patterns = ['LGLG', 'L.L.', 'GGGG', 'LGLGL']
+
+    def test_exact(self):
+        m = ApproximateMatcher(self.patterns)
+        assert m.distances('LGLG', 0) == {0: 0, 1: 0}
+        assert m.distances('GLGL', 0) == {}
+
+    def test_distances(self):
+        m = ApproximateMatcher(self.patterns)
+        assert m.distances('LGLG', 1) == {0: 0, 1: 0, 3: 1}
+        assert m.distances('GGLG', 1) == {0: 1, 1: 1, 2: 1}
+        assert m.distances('GGLG', 2) == {0: 1, 1: 1, 2: 1, 3: 2}
+
+    def test_length_filter(self):
+        m = ApproximateMatcher(self.patterns)
+        assert m.distances('LG', 1) == {}
+        assert m.distances('', 4) == {0: 4, 1: 4, 2: 4}
+
+    def test_search(self):
+        m = ApproximateMatcher(self.patterns)
+        assert list(m.search('GLGLGLGG')) == [
+            (5, 0), (5, 1), (6, 3), (7, 0), (7, 1)]
+        assert list(m.search('GGGGG')) == [(4, 2), (5, 2)]
+        assert list(m.search('')) == []
+
+    def test_match(self):
+        m = ApproximateMatcher(self.patterns)
+        matches = m.match('LGGLG', 1)
+        assert matches == [
+            (0, 1, [('insert', 1, 1)]),
+            (1, 1, [('insert', 1, 1)]),
+        ]
+
+    def test_empty(self):
+        m = ApproximateMatcher([])
+        assert m.match('LG', 2) == []
+
+
+class TestAlign(object):
+
+    def test_exact(self):
+        assert align('LGLG', 'L.LG') == []
+
+    def test_edits(self):
+        assert align('LLLG', 'LGLG') == [('substitute', 1, 1)]
+        assert align('LGG', 'LGLG') == [('delete', 2, 2)]
+        assert align('LGLGG', 'LGLG') == [('insert', 3, 3)]
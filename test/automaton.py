@@ -0,0 +1,75 @@
+import pickle
+
+from chandas.automaton import Automaton
+
+
+class TestAutomaton(object):
+
+    patterns = ['LGLG', 'L.L.', 'GG', '....', '']
+
+    def test_init(self):
+        a = Automaton(self.patterns)
+        assert a.patterns == self.patterns
+        assert sorted(a.starts) == [0, 2, 4]
+        assert len(a) == 3
+
+    def test_empty(self):
+        a = Automaton([])
+        assert a.match('') is None
+        assert a.match('LG') is None
+
+    def test_match(self):
+        a = Automaton(self.patterns)
+        assert a.match('LGLG') == 0
+        assert a.match('LLLL') == 1
+        assert a.match('GG') == 2
+        assert a.match('GGGG') == 3
+        assert a.match('') == 4
+
+    def test_miss(self):
+        a = Automaton(self.patterns)
+        assert a.match('G') is None
+        assert a.match('LGLGL') is None
+
+    def test_match_all(self):
+        a = Automaton(self.patterns)
+        assert a.match_all('LGLG') == (0, 1, 3)
+        assert a.match_all('GLGL') == (3,)
+        assert a.match_all('LGL') == ()
+
+    def test_match_all_many(self):
+        a = Automaton(self.patterns)
+        scans = ['LGLG', 'GLGL', 'LGL', 'LGLL', 'G', '', 'LGLG']
+        assert a.match_all_many(scans) == [a.match_all(x) for x in scans]
+
+    def test_many_wildcards(self):
+        a = Automaton(['.' * 32, 'G' * 32])
+        assert a.match('G' * 32) == 0
+        assert a.match_all('G' * 32) == (0, 1)
+        assert a.match_all('L' * 32) == (0,)
+        assert len(a) < 10
+
+    def test_stride(self):
+        a = Automaton(['.' * 20, 'G' * 10 + '.' * 10])
+        assert a.match_all('G' * 20) == (0, 1)
+        assert a.match_all('G' * 9 + 'L' * 11) == (0,)
+        chunks = list(a.starts[20].transitions)
+        assert len(chunks) == 2
+        assert all(len(chunk) == min(a.STRIDE, 20) for chunk in chunks)
+
+    def test_max_transitions(self):
+        a = Automaton(['.' * 20, 'G' * 20])
+        a.MAX_TRANSITIONS = 1
+        assert a.match_all('G' * 20) == (0, 1)
+        assert a.match_all('G' * 20) == (0, 1)
+        assert a.match_all('L' * 20) == (0,)
+        assert len(a.starts[20].transitions) == 1
+
+    def test_pickle(self):
+        a = Automaton(self.patterns)
+        scans = ['LGLG', 'GLGL', 'GGGGG', 'GL', 'GG']
+        expected = [a.match_all(x) for x in scans]
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            b = pickle.loads(pickle.dumps(a, protocol))
+            assert [b.match_all(x) for x in scans] == expected
+            assert len(b) == len(a)
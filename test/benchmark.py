@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+from bench.runner import compare, main, run
+from bench.synthetic import random_catalog, random_corpus, scan2raw
+from chandas.classify import Classifier
+from chandas.wrappers import Line
+
+
+def test_scan2raw():
+    assert Line(scan2raw('GLLGG')).scan == 'GLLGG'
+
+
+def test_random_catalog():
+    catalog = random_catalog(50, seed=1)
+    assert len(catalog) == 50
+    assert catalog == random_catalog(50, seed=1)
+    classifier = Classifier.from_data(catalog)
+    assert len(classifier.vrttas) + len(classifier.jatis) == 50
+
+
+def test_random_corpus():
+    classifier = Classifier.from_data(random_catalog(50, seed=1))
+    corpus = random_corpus(classifier, 100, seed=1, miss_rate=0)
+    assert all(classifier.classify_many(corpus))
+
+
+def test_compare():
+    classifier = Classifier.from_data(random_catalog(20))
+    results = run(classifier, random_corpus(classifier, 20), repeat=1)
+    assert compare(results, results, 0) == []
+    slower = json.loads(json.dumps(results))
+    slower['stages']['scan']['per_item'] /= 2
+    assert [x[0] for x in compare(results, slower, 0.1)] == ['scan']
+
+
+def test_main(tmpdir):
+    path = str(tmpdir.join('baseline.json'))
+    args = ['--meters', '20', '--verses', '20', '--repeat', '1']
+    assert main(args + ['--save', path]) == 0
+    with open(path) as f:
+        assert json.load(f)['verses'] == 20
@@ -0,0 +1,77 @@
+import itertools
+
+from chandas.bitmask import (PatternIndex, decode_scan, encode_pattern,
+                             encode_scan)
+
+
+def test_encode_scan():
+    assert encode_scan('') == 0
+    assert encode_scan('G') == 1
+    assert encode_scan('GLG') == 0b101
+    assert encode_scan('LLG') == 0b001
+
+
+def test_decode_scan():
+    for scan in ['', 'G', 'L', 'GLG', 'LLG', 'LLLL']:
+        assert decode_scan(encode_scan(scan), len(scan)) == scan
+
+
+def test_encode_pattern():
+    assert encode_pattern('') == (0, 0)
+    assert encode_pattern('GLG') == (0b111, 0b101)
+    assert encode_pattern('G.L.') == (0b1010, 0b1000)
+
+
+class TestPatternIndex(object):
+
+    patterns = ['GGLG', 'GG.G', 'LLLLL', 'L.LL.', 'GGLG']
+
+    def test_match(self):
+        p = PatternIndex(self.patterns)
+        assert p.match('GGLG') == 0
+        assert p.match('GGGG') == 1
+        assert p.match('LGLLG') == 3
+        assert p.match('GGL') is None
+        assert p.match('') is None
+
+    def test_match_all(self):
+        p = PatternIndex(self.patterns)
+        assert p.match_all('GGLG') == (0, 1, 4)
+        assert p.match_all('LLLLL') == (2, 3)
+        assert p.match_all('LGLLL') == (3,)
+        assert p.match_all('LGGLL') == ()
+
+    def test_match_all_many(self):
+        p = PatternIndex(self.patterns)
+        scans = ['GGLG', 'LGGLL', 'LG', 'LLLLL', '', 'GGLG']
+        assert p.match_all_many(scans) == [p.match_all(s) for s in scans]
+
+    def test_empty(self):
+        p = PatternIndex([])
+        assert p.match('') is None
+        assert p.match_all('GL') == ()
+
+    def test_wildcards_only(self):
+        p = PatternIndex(['..', 'GG'])
+        assert p.match_all('GG') == (0, 1)
+        assert p.match_all('LG') == (0,)
+
+    def test_match_all_bits(self):
+        p = PatternIndex(self.patterns)
+        for scan in ['GGLG', 'LLLLL', 'LGGLL', '']:
+            assert (p.match_all_bits(encode_scan(scan), len(scan)) ==
+                    p.match_all(scan))
+
+    def test_many_groups(self, monkeypatch):
+        monkeypatch.setattr(PatternIndex, 'MAX_GROUPS', 2)
+        patterns = ['G..L', 'LGLG', '.G.G', 'L..G', '..GL', 'GGGG', '....']
+        p = PatternIndex(patterns)
+        assert len(p._groups[4]) == 2
+        for scan in itertools.product('LG', repeat=4):
+            scan = ''.join(scan)
+            expected = tuple(i for i, pattern in enumerate(patterns)
+                             if all(x in (y, '.')
+                                    for x, y in zip(pattern, scan)))
+            assert p.match_all(scan) == expected
+            assert p.match_all_bits(encode_scan(scan), 4) == expected
+        assert p.match_all_many(['GLLL', 'GG']) == [(0, 6), ()]
@@ -1,19 +1,14 @@
 # -*- coding: utf-8 -*-
 
 import os
+import pickle
+import shutil
 
 import pytest
 
-from chandas.classify import Classifier
-from chandas.wrappers import Line
-
-
-@pytest.fixture(scope='session')
-def full_classifier():
-    test_dir = os.path.dirname(__file__)
-    project_dir = os.path.dirname(test_dir)
-    json_path = os.path.join(project_dir, 'data', 'data.json')
-    return Classifier.from_json_file(json_path)
+from chandas import classify as classify_module
+from chandas.classify import Classifier, LiveBlock, jati_splits
+from chandas.wrappers import Block, Line, iter_blocks
 
 
 @pytest.fixture
@@ -32,24 +27,6 @@ def classify_line(full_classifier):
     return tester
 
 
-@pytest.fixture
-def megh_1_1():
-    return """
-        kaScit kAntAvirahaguruRA svADikArapramattaH
-        zApenAstaMgamitamahimA varzaBogyeRa BartuH .
-        yakSazcakre janakatanayAsnAnapuRyodakezu
-        snigDacCAyAtaruzu vasatiM rAmagiryASramezu .. 1 ..
-        """
-
-
-@pytest.fixture
-def kale_arya():
-    return """
-        yenAmandamarande daladaravinde dinAnyanAyizata .
-        kuwaje Kalu tenehA tenehA maDukareRa kaTam ..
-        """
-
-
 def test_init():
     classifier = Classifier()
     assert classifier.vrttas == []
@@ -123,6 +100,30 @@ def test_jati_false_positive_pada_a(full_classifier):
     assert full_classifier.classify(data) is None
 
 
+def test_jati_false_positive_trailing(full_classifier, kale_arya):
+    data = kale_arya + "kaTa kaTam"
+    assert full_classifier.classify(data) is None
+
+
+def test_jati_index(full_classifier):
+    totals = sorted(full_classifier._jati_index)
+    assert totals == [55, 56, 57]
+    assert full_classifier.classify('ka') is None
+
+
+def test_classify_many(full_classifier, megh_1_1, kale_arya):
+    data = [megh_1_1, 'ka', kale_arya, megh_1_1, '']
+    expected = [full_classifier.classify(x) for x in data]
+    assert full_classifier.classify_many(data) == expected
+    assert full_classifier.classify_many([]) == []
+
+
+def test_classify_many_blocks(full_classifier, megh_1_1, kale_arya):
+    blocks = iter_blocks(megh_1_1 + '\n\n' + kale_arya)
+    names = [x.name for x in full_classifier.classify_many(blocks)]
+    assert names == [u'mandākrāntā', u'āryā']
+
+
 def test_classify_line_samavrtta(classify_line):
     data = "snigDacCAyAtaruzu vasatiM rAmagiryASramezu"
     assert classify_line(data) == u'mandākrāntā'
@@ -144,9 +145,24 @@ def test_classify_line_shloka(classify_line):
     assert classify_line(data) == u'śloka'
 
 
+def test_classify_line_vishamavrtta_pada(classify_line):
+    data = "klAMtirahitamaBirADayituM viDivattapAMsi vidaDe DanaMjayaH .."
+    assert classify_line(data) == u'udgatā'
+
+
+def test_classify_line_all_candidates(full_classifier):
+    data = "kekake kekakekeke"
+    [(line, candidates)] = full_classifier.classify_lines(
+        data, all_candidates=True)
+    assert line.raw == data
+    assert [(v.name, padas) for v, padas in candidates] == [(u'śloka', (0,))]
+
+
 def test_classify_line_unknown(full_classifier):
     data = 'ka'
     assert full_classifier.classify_lines(data)[0][1] is None
+    padas = full_classifier.classify_lines(data, all_candidates=True)
+    assert padas[0][1] == []
 
 
 def test_split_into_padas_vrtta(full_classifier, megh_1_1):
@@ -168,3 +184,230 @@ def test_split_into_padas_jati(full_classifier, kale_arya):
     assert len(expected) == len(actual)
     for e, a in zip(expected, actual):
         assert e.clean == a.clean
+
+
+def test_snapshot(full_classifier, megh_1_1, tmpdir):
+    path = str(tmpdir.join('catalog.snapshot'))
+    full_classifier.save_snapshot(path)
+    classifier = Classifier.from_snapshot(path)
+    assert [x.name for x in classifier.vrttas] == \
+        [x.name for x in full_classifier.vrttas]
+    assert classifier.classify(megh_1_1).name == u'mandākrāntā'
+
+
+def test_snapshot_rebuild(json_path, kale_arya, tmpdir, monkeypatch):
+    source = str(tmpdir.join('data.json'))
+    path = str(tmpdir.join('catalog.snapshot'))
+    shutil.copy(json_path, source)
+
+    # Missing snapshot
+    classifier = Classifier.from_snapshot(path, source)
+    assert classifier.classify(kale_arya).name == u'āryā'
+    assert os.path.exists(path)
+
+    # Up to date
+    def fail(path):
+        raise AssertionError
+    monkeypatch.setattr(Classifier, 'from_json_file', classmethod(fail))
+    assert Classifier.from_snapshot(path, source).classify(kale_arya)
+    monkeypatch.undo()
+
+    # Changed source
+    with open(source, 'w') as f:
+        f.write('[{"name": "ka", "pattern": ["L"]}]')
+    classifier = Classifier.from_snapshot(path, source)
+    assert classifier.classify('ka ka ka ka').name == 'ka'
+    assert Classifier.from_snapshot(path).classify(kale_arya) is None
+
+
+@pytest.mark.parametrize('stale', [
+    b'cchandas.no_such_module\nClassifier\n.',
+    b'cchandas.classify\nNoSuchClass\n.',
+    b'not a pickle',
+])
+def test_snapshot_rebuild_stale(json_path, kale_arya, tmpdir, stale):
+    path = str(tmpdir.join('catalog.snapshot'))
+    with open(path, 'wb') as f:
+        header = {'version': classify_module.SNAPSHOT_VERSION,
+                  'source': classify_module._file_digest(json_path)}
+        pickle.dump(header, f)
+        f.write(stale)
+    with pytest.raises(Exception):
+        Classifier.from_snapshot(path)
+    classifier = Classifier.from_snapshot(path, json_path)
+    assert classifier.classify(kale_arya).name == u'āryā'
+    assert Classifier.from_snapshot(path).classify(kale_arya)
+
+
+def test_snapshot_version(full_classifier, tmpdir, monkeypatch):
+    path = str(tmpdir.join('catalog.snapshot'))
+    full_classifier.save_snapshot(path)
+    monkeypatch.setattr(classify_module, 'SNAPSHOT_VERSION', -1)
+    with pytest.raises(ValueError):
+        Classifier.from_snapshot(path)
+
+
+def test_classify_result_vrtta(full_classifier, megh_1_1):
+    result = full_classifier.classify(megh_1_1, as_result=True)
+    assert result.padya is full_classifier.classify(megh_1_1)
+    assert result.name == u'mandākrāntā'
+    assert result.spans == [(0, 17), (17, 34), (34, 51), (51, 68)]
+    assert result.ganas == ['mBnttgg'] * 3 + ['mBnttgl']
+    expected = full_classifier.split_into_padas(megh_1_1, result.padya)
+    assert [x.clean for x in result.padas] == [x.clean for x in expected]
+
+
+def test_classify_result_jati(full_classifier, kale_arya):
+    result = full_classifier.classify(kale_arya, as_result=True)
+    assert result.name == u'āryā'
+    assert [x.clean for x in result.padas] == [
+        'yenAmandamarande', 'daladaravindedinAnyanAyizata',
+        'kuwajeKalutenehA', 'tenehAmaDukareRakaTam']
+    assert ''.join(result.scans) == ''.join(result.block.scan)
+
+
+def test_classify_result_repr(full_classifier, megh_1_1):
+    result = full_classifier.classify(megh_1_1, as_result=True)
+    assert result.__unicode__() == u"<Result('mandākrāntā')>"
+    text = repr(result)
+    if isinstance(text, bytes):
+        text = text.decode('utf-8')
+    assert text == u"<Result('mandākrāntā')>"
+
+
+def test_classify_result_miss(full_classifier):
+    assert full_classifier.classify('ka', as_result=True) is None
+
+
+def test_split_into_padas_block(full_classifier, kale_arya):
+    padya = full_classifier.classify(kale_arya)
+    block = Block(kale_arya)
+    actual = full_classifier.split_into_padas(block, padya)
+    expected = full_classifier.split_into_padas(kale_arya, padya)
+    assert [x.clean for x in actual] == [x.clean for x in expected]
+
+
+def test_approximate_matcher_is_lazy(json_path):
+    classifier = Classifier.from_json_file(json_path)
+    assert '_vrtta_matcher' not in classifier.__dict__
+    classifier.classify_approximate('ka')
+    assert '_vrtta_matcher' in classifier.__dict__
+
+
+def test_classify_approximate(full_classifier, megh_1_1):
+    noisy = megh_1_1.replace('kaScit', 'kaSci', 1)
+    assert full_classifier.classify(noisy) is None
+    [(vrtta, distance, edits)] = full_classifier.classify_approximate(
+        noisy, max_errors=1)
+    assert vrtta.name == u'mandākrāntā'
+    assert distance == 1
+    assert edits == [('substitute', 1, 1)]
+    exact = full_classifier.classify_approximate(megh_1_1, max_errors=0)
+    assert [(v.name, d) for v, d, _ in exact] == [(u'mandākrāntā', 0)]
+
+
+def test_live_block(full_classifier, megh_1_1, kale_arya):
+    live = LiveBlock(full_classifier, megh_1_1)
+    assert live.padya.name == u'mandākrāntā'
+    assert live.result.spans == [(0, 17), (17, 34), (34, 51), (51, 68)]
+
+    typo = 'kaSci kAntAvirahaguruRA svADikArapramattaH'
+    assert live.replace_line(0, typo) is None
+    assert live.result is None
+    padya = live.replace_line(0, 'kaScit kAntAvirahaguruRA svADikArapramattaH')
+    assert padya.name == u'mandākrāntā'
+    assert live.block.scan == Block(megh_1_1).scan
+
+    with pytest.raises(ValueError):
+        live.replace_line(0, 'ka\nkA')
+    assert live.padya is padya
+
+
+def test_live_block_jati(full_classifier, kale_arya):
+    live = LiveBlock(full_classifier, kale_arya)
+    assert live.padya.name == u'āryā'
+    lines = [x.raw for x in live.block.lines]
+    live.replace_line(1, 'kuwaje Kalu tenehA')
+    assert live.padya is None
+    live.replace_line(1, lines[1])
+    assert live.padya.name == u'āryā'
+    assert [x.clean for x in live.result.padas][0] == 'yenAmandamarande'
+
+
+def test_detect(full_classifier, megh_1_1):
+    prose = 'iti uktvA sa rAjA vanaM jagAma . tatra '
+    raw = prose + ' '.join(megh_1_1.split()) + ' ityAdi'
+    found = full_classifier.detect(raw, min_syllables=40)
+    assert [(p.name, raw[i:j][:6]) for i, j, p in found] == [
+        (u'mandākrāntā', 'kaScit')]
+    assert raw[found[0][1] - 6:found[0][1]] == 'ramezu'
+
+
+def test_detect_jati(full_classifier, kale_arya):
+    raw = 'ka ' + ' '.join(kale_arya.split()) + ' ka'
+    found = full_classifier.detect(raw, min_syllables=20)
+    assert (raw.index('yenA'), raw.index('kaTam') + 5,
+            full_classifier.classify(kale_arya)) in found
+
+
+def test_classify_all():
+    c = Classifier.from_data([
+        {'name': 'a', 'pattern': ['GGGG']},
+        {'name': 'b', 'pattern': ['GG.G']},
+        {'name': 'c', 'pattern': ['LLLL']},
+        {'name': 'x', 'pattern': [], 'counts': [8, 8, 8, 8]},
+        {'name': 'y', 'pattern': [], 'counts': [8, 8, 8, 8]},
+        {'name': 'z', 'pattern': [], 'counts': [4, 4, 4, 4]},
+    ])
+    raw = '\n'.join(['kAkAkAkA'] * 4)
+    results = c.classify_all(raw)
+    assert [r.name for r in results] == ['a', 'b', 'x', 'y']
+    assert all(r.block is results[0].block for r in results)
+    assert [r.spans for r in results] == [
+        [(0, 4), (4, 8), (8, 12), (12, 16)]] * 4
+    assert results[0].padya is c.classify(raw)
+    assert c.classify_all('ka') == []
+
+
+def test_classify_all_full(full_classifier, megh_1_1, kale_arya):
+    for raw in (megh_1_1, kale_arya):
+        [result] = full_classifier.classify_all(raw)
+        expected = full_classifier.classify(raw, as_result=True)
+        assert result.padya is expected.padya
+        assert result.spans == expected.spans
+
+
+def test_jati_splits(full_classifier, kale_arya):
+    arya = full_classifier.classify(kale_arya)
+    scan = ''.join(Block(kale_arya).scan)
+    assert jati_splits(arya, scan) == [[(0, 7), (7, 20), (20, 28), (28, 38)]]
+
+    # Pāda B can be 18 or 17 mātrās long, and each leaves a valid
+    # division.
+    scan = 'G' * 14 + 'LL' + 'G' * 5 + 'LL' + 'G' * 7
+    assert jati_splits(arya, scan, ganas=False) == [
+        [(0, 6), (6, 16), (16, 23), (23, 30)],
+        [(0, 6), (6, 15), (15, 22), (22, 30)],
+    ]
+    # But the sixth gaṇa of the first half must be ja or four laghus.
+    assert jati_splits(arya, scan) == []
+    assert jati_splits(arya, 'GGG') == []
+
+
+def test_jati_splits_odd_ja(full_classifier):
+    arya = full_classifier.jatis[0]
+    half_1 = 'GG' * 5 + 'LGL' + 'GG' + 'G'
+    half_2 = 'GG' * 5 + 'L' + 'GG' + 'G'
+    assert len(jati_splits(arya, half_1 + half_2)) == 1
+    # A ja-gaṇa in the first gaṇa.
+    assert jati_splits(arya, 'LGL' + half_1[2:] + half_2) == []
+    assert len(jati_splits(arya, 'LGL' + half_1[2:] + half_2,
+                           ganas=False)) == 1
+
+
+def test_all_pada_splits(full_classifier, megh_1_1, kale_arya):
+    for raw in (megh_1_1, kale_arya):
+        padya = full_classifier.classify(raw)
+        [split] = full_classifier.all_pada_splits(raw, padya)
+        expected = full_classifier.split_into_padas(raw, padya)
+        assert [x.clean for x in split] == [x.clean for x in expected]
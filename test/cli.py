@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+
+import pytest
+
+from chandas.cli import format_tsv, iter_rows, main
+
+
+@pytest.fixture
+def corpus_path(tmpdir):
+    text = (u'kaScit kAntAvirahaguruRA svADikArapramattaH\n'
+            u'zApenAstaMgamitamahimA varzaBogyeRa BartuH .\n'
+            u'yakSazcakre janakatanayAsnAnapuRyodakezu\n'
+            u'snigDacCAyAtaruzu vasatiM rAmagiryASramezu .. 1 ..\n'
+            u'\n'
+            u'ka\n'
+            u'\n'
+            u'yenAmandamarande daladaravinde dinAnyanAyizata .\n'
+            u'kuwaje Kalu tenehA tenehA maDukareRa kaTam ..\n')
+    path = tmpdir.join('corpus.txt')
+    path.write_binary(text.encode('utf-8'))
+    return str(path)
+
+
+def test_iter_rows(full_classifier, corpus_path):
+    rows = list(iter_rows(full_classifier, [corpus_path, corpus_path]))
+    assert len(rows) == 6
+    assert ([r['meter'] for r in rows[:3]] ==
+            [u'mandākrāntā', None, u'āryā'])
+    assert [r['block'] for r in rows] == [0, 1, 2, 0, 1, 2]
+    assert rows[1] == {'file': corpus_path, 'block': 1, 'line': 6,
+                       'start': 182, 'end': 184, 'meter': None}
+
+    with io.open(corpus_path, 'rb') as f:
+        data = f.read()
+    assert data[rows[1]['start']:rows[1]['end']] == b'ka'
+
+
+def test_iter_rows_padas(full_classifier, corpus_path):
+    rows = list(iter_rows(full_classifier, [corpus_path], padas=True))
+    assert rows[0]['padas'][1] == 'zApenAstaMgamitamahimAvarzaBogyeRaBartuH'
+    assert rows[1]['padas'] is None
+    assert len(rows[2]['padas']) == 4
+
+
+def test_format_tsv():
+    row = {'file': 'x', 'block': 0, 'line': 1, 'start': 0, 'end': 2,
+           'meter': None}
+    assert format_tsv(row) == u'x\t0\t1\t0\t2\t\n'
+    row['padas'] = ['a', 'b']
+    row['meter'] = u'āryā'
+    assert format_tsv(row) == u'x\t0\t1\t0\t2\tāryā\ta/b\n'
+
+
+def test_main_jsonl(json_path, corpus_path, tmpdir):
+    out = str(tmpdir.join('out.jsonl'))
+    assert main([corpus_path, '--catalog', json_path, '-o', out, '-q']) == 0
+    with io.open(out, encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f]
+    assert [r['meter'] for r in rows] == [u'mandākrāntā', None, u'āryā']
+    assert rows[2]['line'] == 8
+
+
+def test_main_tsv(json_path, corpus_path, tmpdir, capsys):
+    out = str(tmpdir.join('out.tsv'))
+    main([corpus_path, '--catalog', json_path, '-o', out, '--format', 'tsv',
+          '--header', '--padas', '--jobs', '2', '--chunk-size', '1'])
+    with io.open(out, encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    assert lines[0] == u'file\tblock\tline\tstart\tend\tmeter\tpadas'
+    assert len(lines) == 4
+    assert lines[3].split(u'\t')[5] == u'āryā'
+    assert '3 blocks, 2 matched' in capsys.readouterr().err
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+
+from chandas.classify import Classifier
+
+
+@pytest.fixture(scope='session')
+def json_path():
+    test_dir = os.path.dirname(__file__)
+    project_dir = os.path.dirname(test_dir)
+    return os.path.join(project_dir, 'data', 'data.json')
+
+
+@pytest.fixture(scope='session')
+def full_classifier(json_path):
+    return Classifier.from_json_file(json_path)
+
+
+@pytest.fixture
+def megh_1_1():
+    return """
+        kaScit kAntAvirahaguruRA svADikArapramattaH
+        zApenAstaMgamitamahimA varzaBogyeRa BartuH .
+        yakSazcakre janakatanayAsnAnapuRyodakezu
+        snigDacCAyAtaruzu vasatiM rAmagiryASramezu .. 1 ..
+        """
+
+
+@pytest.fixture
+def kale_arya():
+    return """
+        yenAmandamarande daladaravinde dinAnyanAyizata .
+        kuwaje Kalu tenehA tenehA maDukareRa kaTam ..
+        """
+
+
+@pytest.fixture
+def corpus(megh_1_1, kale_arya):
+    """A mandākrāntā, an āryā, and a miss, repeated five times."""
+    return '\n\n'.join([megh_1_1, kale_arya, 'ka'] * 5)
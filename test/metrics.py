@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+from chandas.metrics import Histogram, InstrumentedClassifier, Metrics
+
+
+class TestHistogram(object):
+
+    def test_observe(self):
+        h = Histogram([1, 2])
+        for value in (0.5, 1, 1.5, 3):
+            h.observe(value)
+        assert h.counts == [2, 1, 1]
+        d = h.to_dict()
+        assert d['buckets'] == [(1, 2), (2, 3), (float('inf'), 4)]
+        assert d['count'] == 4
+        assert d['sum'] == 6
+
+
+class TestInstrumentedClassifier(object):
+
+    def test_classify(self, full_classifier, megh_1_1, kale_arya):
+        c = InstrumentedClassifier(full_classifier)
+        for raw in (megh_1_1, kale_arya, megh_1_1, 'ka'):
+            assert c.classify(raw) == full_classifier.classify(raw)
+
+        m = c.metrics
+        assert (m.verses, m.vrtta_hits, m.jati_hits, m.misses) == (4, 2, 1, 1)
+        assert m.meter_hits == {u'mandākrāntā': 2, u'āryā': 1}
+        assert m.stages['scan'].count == 4
+        assert m.stages['vrtta'].count == 4
+        assert m.stages['jati'].count == 2
+        assert m.stages['lines'].count == 0
+
+    def test_classify_as_result(self, full_classifier, megh_1_1):
+        c = InstrumentedClassifier(full_classifier)
+        result = c.classify(megh_1_1, as_result=True)
+        assert result.name == u'mandākrāntā'
+        assert c.metrics.vrtta_hits == 1
+        assert full_classifier.metrics is None
+
+    def test_classify_many(self, full_classifier, corpus):
+        c = InstrumentedClassifier(full_classifier)
+        raws = corpus.split('\n\n')
+        assert c.classify_many(raws) == full_classifier.classify_many(raws)
+
+        m = c.metrics
+        assert (m.verses, m.vrtta_hits, m.jati_hits, m.misses) == (15, 5, 5, 5)
+        assert m.stages['scan'].count == 0
+
+    def test_classify_lines(self, full_classifier, megh_1_1):
+        c = InstrumentedClassifier(full_classifier)
+        padas = c.classify_lines(megh_1_1)
+        assert [v.name for _, v in padas] == [u'mandākrāntā'] * 4
+        assert c.metrics.lines == 4
+        assert c.metrics.stages['lines'].count == 1
+
+
+class TestMetrics(object):
+
+    def test_to_dict(self, full_classifier, megh_1_1):
+        metrics = Metrics()
+        InstrumentedClassifier(full_classifier, metrics).classify(megh_1_1)
+        d = metrics.to_dict()
+        assert d['verses'] == 1
+        assert d['meter_hits'] == {u'mandākrāntā': 1}
+        assert sorted(d['stages']) == sorted(Metrics.STAGES)
+
+    def test_to_prometheus(self, full_classifier, megh_1_1):
+        c = InstrumentedClassifier(full_classifier)
+        c.classify(megh_1_1)
+        c.metrics.meter_hits['a "b"'] = 1
+        text = c.metrics.to_prometheus()
+        lines = text.splitlines()
+        assert '# TYPE chandas_verses_total counter' in lines
+        assert 'chandas_verses_total 1' in lines
+        assert 'chandas_results_total{result="vrtta"} 1' in lines
+        assert u'chandas_meter_hits_total{meter="mandākrāntā"} 1' in lines
+        assert 'chandas_meter_hits_total{meter="a \\"b\\""} 1' in lines
+        assert ('chandas_stage_seconds_bucket{le="+Inf",stage="scan"} 1'
+                in lines)
+        assert 'chandas_stage_seconds_count{stage="jati"} 0' in lines
+
+    def test_stages(self, full_classifier, megh_1_1):
+        metrics = Metrics(stages=('lines',))
+        c = InstrumentedClassifier(full_classifier, metrics)
+        c.classify(megh_1_1)
+        c.classify_lines(megh_1_1)
+        assert sorted(metrics.to_dict()['stages']) == ['lines']
+        assert metrics.stages['lines'].count == 1
+        text = metrics.to_prometheus()
+        assert 'stage="lines"' in text
+        assert 'stage="scan"' not in text
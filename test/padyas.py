@@ -20,6 +20,18 @@ class TestSamavrtta(object):
         assert v.scans[:1] == self.pattern
         assert v.scans == self.pattern * 4
 
+    def test_verse_pattern(self):
+        v = Samavrtta('anuzwuB', ['LG..'])
+        assert v.verse_pattern == 'LG..' 'LG..' 'LG..' 'LG..'
+        v = Samavrtta(self.name, self.pattern)
+        assert v.verse_pattern == ('GGGGLLLLLGGLGGLGG' 'GGGGLLLLLGGLGGLG.'
+                                   'GGGGLLLLLGGLGGLGG' 'GGGGLLLLLGGLGGLG.')
+
+
+    def test_line_patterns(self):
+        v = Samavrtta(self.name, self.pattern)
+        assert v.line_patterns == [((0,), 'GGGGLLLLLGGLGGLG.')]
+
 
 class TestArdhasamavrtta(object):
 
@@ -44,6 +56,14 @@ class TestVishamavrtta(object):
         assert v.scans == self.pattern
 
 
+    def test_line_patterns(self):
+        v = Vishamavrtta(self.name, self.pattern)
+        padas = [padas for padas, _ in v.line_patterns]
+        assert padas == [(0,), (1,), (2,), (3,), (0, 1), (2, 3), (0, 1, 2, 3)]
+        assert v.line_patterns[1][1] == 'LLLLLGLGL.'
+        assert v.line_patterns[-1][1] == v.verse_pattern
+
+
 class TestJati(object):
 
     name = 'AryA'
@@ -54,3 +74,16 @@ class TestJati(object):
         assert v.name == self.name
         assert v.scans == []
         assert v.counts == self.counts
+
+    def test_boundaries(self):
+        v = Jati(self.name, [], self.counts)
+        assert v.boundaries == [((12, 30, 42), (57, 56)),
+                                ((12, 29, 41), (56, 55))]
+
+    def test_masks(self):
+        v = Jati(self.name, [], self.counts)
+        (required, ends), (required_short, ends_short) = v.masks
+        assert required == (1 << 12) | (1 << 30) | (1 << 42)
+        assert ends == (1 << 57) | (1 << 56)
+        assert required_short == (1 << 12) | (1 << 29) | (1 << 41)
+        assert ends_short == (1 << 56) | (1 << 55)
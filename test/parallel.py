@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+import io
+
+import pytest
+
+from chandas.parallel import classify_corpus, classify_mapped, meters
+from chandas.wrappers import iter_blocks
+
+
+def test_meters(full_classifier):
+    m = meters(full_classifier)
+    assert m[0] is full_classifier.vrttas[0]
+    assert m[-1] is full_classifier.jatis[-1]
+
+
+def test_single_process(full_classifier, corpus):
+    expected = full_classifier.classify_many(iter_blocks(corpus))
+    actual = list(classify_corpus(full_classifier, corpus, jobs=1,
+                                  chunk_size=4))
+    assert [i for i, _ in actual] == list(range(15))
+    assert [p for _, p in actual] == expected
+
+
+def test_pool(full_classifier, corpus):
+    expected = list(classify_corpus(full_classifier, corpus, jobs=1))
+    actual = classify_corpus(full_classifier, iter_blocks(corpus), jobs=2,
+                             chunk_size=2)
+    assert [(i, p and p.name) for i, p in actual] == \
+        [(i, p and p.name) for i, p in expected]
+
+
+def test_file(full_classifier, corpus):
+    expected = list(classify_corpus(full_classifier, corpus, jobs=1))
+    f = io.BytesIO(corpus.encode('utf-8'))
+    assert list(classify_corpus(full_classifier, f, jobs=1)) == expected
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_padas(full_classifier, corpus, jobs):
+    raws = corpus.split('\n\n')
+    actual = list(classify_corpus(full_classifier, corpus, jobs=jobs,
+                                  chunk_size=2, padas=True))
+    assert [i for i, _, _ in actual] == list(range(15))
+    for raw, (_, padya, texts) in zip(raws, actual):
+        expected = full_classifier.classify(raw)
+        assert padya is expected
+        if expected is None:
+            assert texts is None
+        else:
+            lines = full_classifier.split_into_padas(raw, expected)
+            assert texts == [line.raw for line in lines]
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_classify_mapped(full_classifier, corpus, tmpdir, jobs):
+    path = tmpdir.join('corpus.txt')
+    path.write_binary(corpus.encode('utf-8'))
+    expected = full_classifier.classify_many(iter_blocks(corpus))
+    actual = list(classify_mapped(full_classifier, str(path), jobs=jobs,
+                                  range_size=64))
+    assert [p for _, _, p in actual] == expected
+    data = corpus.encode('utf-8')
+    assert data[actual[2][0]:actual[2][1]] == b'ka'
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+
+import copy
+import json
+import threading
+
+import pytest
+
+try:
+    from urllib.request import Request, urlopen
+    from urllib.error import HTTPError
+except ImportError:
+    # Python 2
+    from urllib2 import HTTPError, Request, urlopen
+
+from chandas.server import Batcher, ClassifierServer
+
+
+@pytest.fixture(params=[1, 2])
+def server(request, full_classifier):
+    server = ClassifierServer(('127.0.0.1', 0), full_classifier,
+                              jobs=request.param)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,))
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _url(server, path):
+    return 'http://127.0.0.1:%d%s' % (server.server_address[1], path)
+
+
+def _get(server, path):
+    response = urlopen(_url(server, path))
+    return response.read().decode('utf-8')
+
+
+def _post(server, path, data):
+    body = json.dumps(data).encode('utf-8')
+    request = Request(_url(server, path), body,
+                      {'Content-Type': 'application/json'})
+    return json.loads(urlopen(request).read().decode('utf-8'))
+
+
+def test_classify(server, megh_1_1):
+    assert _post(server, '/classify', {'text': megh_1_1}) == {
+        'meter': u'mandākrāntā'}
+    assert _post(server, '/classify', {'text': 'ka'}) == {'meter': None}
+
+
+def test_classify_many(server, megh_1_1):
+    data = {'texts': [megh_1_1, 'ka', megh_1_1]}
+    assert _post(server, '/classify_many', data) == {
+        'meters': [u'mandākrāntā', None, u'mandākrāntā']}
+    assert _post(server, '/classify_many', {'texts': []}) == {'meters': []}
+
+
+def test_classify_many_concurrent(server, megh_1_1):
+    results = []
+
+    def post():
+        results.append(_post(server, '/classify', {'text': megh_1_1}))
+
+    threads = [threading.Thread(target=post) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [{'meter': u'mandākrāntā'}] * 8
+    assert server.batcher.batches <= 8
+
+
+def test_classify_lines(server, megh_1_1):
+    lines = _post(server, '/classify_lines', {'text': megh_1_1})['lines']
+    assert len(lines) == 4
+    assert lines[0]['meter'] == u'mandākrāntā'
+    assert lines[0]['text'].startswith('kaScit')
+
+    data = {'text': megh_1_1, 'all_candidates': True}
+    lines = _post(server, '/classify_lines', data)['lines']
+    assert {'meter': u'mandākrāntā', 'padas': [0]} in lines[0]['candidates']
+
+
+def test_errors(server):
+    for path, data in [('/classify', {}), ('/classify', {'text': 5}),
+                       ('/classify_many', {'texts': 1}),
+                       ('/classify_many', {'texts': 'kaka'}),
+                       ('/classify_many', {'texts': ['ka', 5]}),
+                       ('/classify_lines', {'text': None})]:
+        with pytest.raises(HTTPError) as e:
+            _post(server, path, data)
+        assert e.value.code == 400
+    with pytest.raises(HTTPError) as e:
+        _get(server, '/nothing')
+    assert e.value.code == 404
+
+
+def test_health_and_metrics(server, megh_1_1):
+    health = json.loads(_get(server, '/health'))
+    assert health['status'] == 'ok'
+    assert health['vrttas'] == len(server.classifier.vrttas)
+
+    _post(server, '/classify_many', {'texts': [megh_1_1, 'ka']})
+    _post(server, '/classify_lines', {'text': megh_1_1})
+    metrics = json.loads(_get(server, '/metrics'))
+    assert metrics['verses'] == 2
+    assert metrics['vrtta_hits'] == 1
+    assert metrics['misses'] == 1
+    assert metrics['lines'] == 4
+    assert metrics['requests']['/classify_many'] == 1
+    assert metrics['batches'] == 1
+
+    assert sorted(metrics['stages']) == ['lines']
+
+    text = _get(server, '/metrics?format=prometheus')
+    assert 'chandas_verses_total 2' in text
+    assert 'stage="lines"' in text
+    assert 'stage="scan"' not in text
+
+
+def test_bad_request_in_batch(full_classifier, megh_1_1):
+    server = ClassifierServer(('127.0.0.1', 0), full_classifier,
+                              max_wait=0.1)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,))
+    thread.daemon = True
+    thread.start()
+    results = {}
+
+    def post(key, path, data):
+        try:
+            results[key] = _post(server, path, data)
+        except HTTPError as e:
+            results[key] = e.code
+
+    threads = [
+        threading.Thread(target=post, args=(
+            'good', '/classify', {'text': megh_1_1})),
+        threading.Thread(target=post, args=(
+            'bad', '/classify_many', {'texts': ['ka', 5]})),
+    ]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert results == {'good': {'meter': u'mandākrāntā'}, 'bad': 400}
+
+
+@pytest.mark.parametrize('error', [RuntimeError, KeyError])
+def test_classifier_error(full_classifier, megh_1_1, error):
+    def fail(*args):
+        raise error('broken')
+
+    classifier = copy.copy(full_classifier)
+    classifier.classify_many = classifier.classify_lines = fail
+    server = ClassifierServer(('127.0.0.1', 0), classifier)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,))
+    thread.daemon = True
+    thread.start()
+    try:
+        for path, data in [('/classify', {'text': megh_1_1}),
+                           ('/classify_many', {'texts': [megh_1_1]}),
+                           ('/classify_lines', {'text': megh_1_1})]:
+            with pytest.raises(HTTPError) as e:
+                _post(server, path, data)
+            assert e.value.code == 500
+            body = json.loads(e.value.read().decode('utf-8'))
+            assert body == {'error': 'internal error'}
+        assert json.loads(_get(server, '/health'))['status'] == 'ok'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class TestBatcher(object):
+
+    def test_submit(self):
+        calls = []
+
+        def classify_many(raws):
+            calls.append(list(raws))
+            return [len(raw) for raw in raws]
+
+        b = Batcher(classify_many, max_wait=0)
+        assert b.submit(['a', 'bb']) == [1, 2]
+        assert b.submit([]) == []
+        b.close()
+        assert calls == [['a', 'bb']]
+        assert b.batches == 1
+
+    def test_batches_requests(self):
+        calls = []
+        release = threading.Event()
+
+        def classify_many(raws):
+            calls.append(list(raws))
+            release.wait()
+            return raws
+
+        b = Batcher(classify_many, max_wait=0.1)
+        results = {}
+
+        def submit(raw):
+            results[raw] = b.submit([raw])
+
+        threads = [threading.Thread(target=submit, args=(x,))
+                   for x in 'abc']
+        for t in threads:
+            t.start()
+        release.set()
+        for t in threads:
+            t.join()
+        b.close()
+        assert results == {'a': ['a'], 'b': ['b'], 'c': ['c']}
+        assert sum(len(c) for c in calls) == 3
+
+    def test_error_in_batch(self):
+        release = threading.Event()
+
+        def classify_many(raws):
+            release.wait()
+            if 'bad' in raws:
+                raise ValueError(raws)
+            return raws
+
+        b = Batcher(classify_many, max_wait=0.1)
+        results = {}
+
+        def submit(raw):
+            try:
+                results[raw] = b.submit([raw])
+            except ValueError:
+                results[raw] = 'error'
+
+        threads = [threading.Thread(target=submit, args=(x,))
+                   for x in ('a', 'bad', 'c')]
+        for t in threads:
+            t.start()
+        release.set()
+        for t in threads:
+            t.join()
+        b.close()
+        assert results == {'a': ['a'], 'bad': 'error', 'c': ['c']}
+
+    def test_error(self):
+        def classify_many(raws):
+            raise ValueError(raws)
+
+        b = Batcher(classify_many, max_wait=0)
+        with pytest.raises(ValueError):
+            b.submit(['a'])
+        b.close()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from chandas.classify import Classifier
+from chandas.vectorized import VectorClassifier
+from chandas.wrappers import iter_blocks
+
+
+@pytest.fixture(scope='session')
+def vector_classifier(full_classifier):
+    return VectorClassifier(full_classifier)
+
+
+def _classify_scan(classifier, scan):
+    padya = classifier.match_vrtta(scan)
+    if padya is not None:
+        return padya
+    return classifier.match_jati(scan)
+
+
+def test_classify_many(full_classifier, vector_classifier, corpus):
+    expected = full_classifier.classify_many(iter_blocks(corpus))
+    actual = vector_classifier.classify_many(iter_blocks(corpus))
+    assert actual == expected
+    assert actual[0].name == u'mandākrāntā'
+    assert actual[1].name == u'āryā'
+    assert actual[2] is None
+
+
+def test_classify_many_raw(full_classifier, vector_classifier, corpus):
+    raws = corpus.split('\n\n') + ['']
+    assert (vector_classifier.classify_many(raws) ==
+            full_classifier.classify_many(raws))
+
+
+def test_classify_scans_catalog(full_classifier, vector_classifier):
+    rand = random.Random(0)
+    scans = []
+    for vrtta in full_classifier.vrttas:
+        scans.append(''.join(rand.choice('LG') if x == '.' else x
+                             for x in vrtta.verse_pattern))
+    expected = [_classify_scan(full_classifier, x) for x in scans]
+    assert vector_classifier.classify_scans(scans) == expected
+    assert all(expected)
+
+
+def test_classify_scans_random(full_classifier, vector_classifier):
+    rand = random.Random(0)
+    scans = [''.join(rand.choice('LG') for _ in range(rand.randint(0, 64)))
+             for _ in range(2000)]
+    expected = [_classify_scan(full_classifier, x) for x in scans]
+    assert vector_classifier.classify_scans(scans) == expected
+    assert any(p in full_classifier.jatis for p in expected)
+
+
+def test_max_rows(full_classifier, corpus):
+    v = VectorClassifier(full_classifier, max_rows=2)
+    raws = corpus.split('\n\n')
+    assert v.classify_many(raws) == full_classifier.classify_many(raws)
+
+
+def test_empty_catalog():
+    v = VectorClassifier(Classifier())
+    assert v.classify_scans(['', 'LG']) == [None, None]
+    assert v.classify_scans([]) == []
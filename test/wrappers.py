@@ -1,5 +1,9 @@
 # -*- coding: utf-8 -*-
 
+import io
+
+import pytest
+
 from chandas.wrappers import *
 
 
@@ -109,6 +113,12 @@ class TestLineGana(MeterTest):
         yes('GGGLLGLGLLLGGGLGGLG', 'msjsttg')  # śārdūlavikrīḍita
 
 
+class TestScanToGana(TestLineGana):
+
+    def check(self, scanned, result):
+        return scan_to_gana(scanned) == result
+
+
 class TestLineMatraCount(MeterTest):
 
     def check(self, scanned, result):
@@ -134,6 +144,24 @@ class TestLineMatraCount(MeterTest):
         self.yes('LLLLGLLGG', 12)
 
 
+class TestLineImmutable(object):
+
+    def test_slots(self):
+        line = Line('kaScit')
+        with pytest.raises(AttributeError):
+            line.foo = 1
+        with pytest.raises(AttributeError):
+            line.raw = 'ka'
+
+    def test_interned_scan(self):
+        assert Line('kaScit').scan is Line('kA tI').scan
+
+    def test_syllables_copy(self):
+        line = Line('kaScit')
+        line.syllables.append('ka')
+        assert line.syllables == ['ka', 'Scit']
+
+
 class TestLineScan(MeterTest):
 
     def func(self, raw):
@@ -228,6 +256,12 @@ class TestLineScan(MeterTest):
         assert self.func('naraH iti') == 'LLLL'
 
 
+class TestScanText(TestLineScan):
+
+    def func(self, raw):
+        return scan_text(raw)
+
+
 class TestLineStartsWithConjunct(MeterTest):
 
     def check(self, raw):
@@ -274,6 +308,54 @@ class TestLineSyllables(MeterTest):
         yes('kArtsnyam', 'kA rtsnyam')
 
 
+class CachedLineTest(object):
+
+    def setup_method(self, method):
+        self.cache = enable_line_cache(capacity=8)
+
+    def teardown_method(self, method):
+        disable_line_cache()
+
+
+class TestCachedLineScan(CachedLineTest, TestLineScan):
+    pass
+
+
+class TestCachedLineSyllables(CachedLineTest, TestLineSyllables):
+    pass
+
+
+class TestLineCache(CachedLineTest):
+
+    def test_enable(self):
+        assert get_line_cache() is self.cache
+        disable_line_cache()
+        assert get_line_cache() is None
+
+    def test_hits(self):
+        assert Line('kaScit').scan == 'GG'
+        assert Line('ka Scit').syllables == ['ka', 'Scit']
+        assert not Line('kaScit ..').starts_with_conjunct
+        assert (self.cache.hits, self.cache.misses) == (2, 1)
+        assert len(self.cache) == 1
+
+    def test_evictions(self):
+        for i in range(10):
+            Line('ka' * (i + 1)).scan
+        assert len(self.cache) == 8
+        assert self.cache.evictions == 2
+        Line('kaka').scan
+        assert self.cache.misses == 11
+        Line('ka' * 10).scan
+        assert self.cache.hits == 1
+
+    def test_clear(self):
+        Line('ka').scan
+        self.cache.clear()
+        assert len(self.cache) == 0
+        assert self.cache.misses == 0
+
+
 class BlockTest(MeterTest):
 
     megh_1_1 = """
@@ -303,6 +385,57 @@ class TestBlockScan(BlockTest):
         self.yes(self.megh_1_1, scan)
 
 
+class TestBlockImmutable(BlockTest):
+
+    def test_slots(self):
+        block = Block(self.bg_1_1)
+        with pytest.raises(AttributeError):
+            block.foo = 1
+        with pytest.raises(AttributeError):
+            block.raw = 'ka'
+        assert isinstance(block.lines, tuple)
+
+    def test_scan_copy(self):
+        block = Block(self.bg_1_1)
+        block.scan.append('G')
+        block.syllables.append('ka')
+        assert len(block.scan) == 2
+        assert block.syllables == Block(self.bg_1_1).syllables
+
+
+class TestBlockReplaceLine(BlockTest):
+
+    def test_replace(self):
+        block = Block(self.bg_1_1)
+        block.scan
+        new = block.replace_line(1, 'mAmakAH pARqavAScEva kimakurvata saMjaya')
+        assert new.scan == Block(new.raw).scan
+        assert new.lines[0] is block.lines[0]
+        assert block.lines[1].raw.startswith('mAmakAH')
+        assert new.offset is None
+
+    def test_previous_line(self):
+        # Whether the new line starts with a conjunct changes the final
+        # syllable of the line before it.
+        block = Block('ka\nka')
+        assert block.scan == ['L', 'L']
+        new = block.replace_line(-1, 'kra')
+        assert new.scan == ['G', 'L']
+        assert new.replace_line(1, 'ka').scan == ['L', 'L']
+
+    def test_unscanned(self):
+        block = Block('ka\nka')
+        new = block.replace_line(1, 'kra')
+        assert new.scan == ['G', 'L']
+
+    def test_invalid(self):
+        block = Block('ka\nka')
+        for raw in ['', '  ', 'ka\nkA', 'ka\n\nkA']:
+            with pytest.raises(ValueError):
+                block.replace_line(0, raw)
+        assert block.replace_line(0, ' kA\n').raw == 'kA\nka'
+
+
 class TestBlockSyllables(BlockTest):
 
     def test_basic(self):
@@ -313,6 +446,20 @@ class TestBlockSyllables(BlockTest):
         assert list(expected) == Block(self.bg_1_1).syllables
 
 
+class TestScanOffsets(object):
+
+    def test_offsets(self):
+        raw = 'kaScit kAntA . aMka'
+        scan, starts, ends = scan_offsets(raw)
+        assert scan == scan_text(raw)
+        assert [raw[i:j] for i, j in zip(starts, ends)] == [
+            'ka', 'Scit', 'kA', 'ntA', 'aM', 'ka']
+
+    def test_empty(self):
+        assert scan_offsets('') == ('', [], [])
+        assert scan_offsets('kt .') == ('', [], [])
+
+
 class TestIterBlocks(object):
 
     def test_iter(self):
@@ -326,3 +473,78 @@ class TestIterBlocks(object):
             '  This is a block.',
             'This is another block.',
             'This is a third block.']
+
+
+class TestIterFileBlocks(object):
+
+    raw = (
+        b"  This is a block.\n\n"
+        b"This is another\r\nblock.\n    \n\n"
+        b"This is a third block."
+    )
+
+    def test_iter(self):
+        blocks = list(iter_file_blocks(io.BytesIO(self.raw)))
+        assert [x.raw for x in blocks] == [
+            '  This is a block.',
+            'This is another\r\nblock.',
+            'This is a third block.']
+        assert [x.line_number for x in blocks] == [1, 3, 7]
+        for block in blocks:
+            span = self.raw[block.offset:block.end_offset]
+            assert span.decode('utf-8') == block.raw
+
+    def test_path(self, tmpdir):
+        path = tmpdir.join('blocks.txt')
+        path.write_binary(b"\n\nka\nkA\n\n\n")
+        blocks = list(iter_file_blocks(str(path), buffer_size=4))
+        assert [x.raw for x in blocks] == ['ka\nkA']
+        assert blocks[0].line_number == 3
+        assert blocks[0].offset == 2
+        assert blocks[0].end_offset == 7
+
+
+class TestMappedCorpus(object):
+
+    raw = TestIterFileBlocks.raw + b"\r\n\n \t\nka\r\n"
+
+    @pytest.fixture
+    def path(self, tmpdir):
+        path = tmpdir.join('corpus.txt')
+        path.write_binary(self.raw)
+        return str(path)
+
+    def test_blocks(self, path):
+        expected = list(iter_file_blocks(io.BytesIO(self.raw)))
+        with MappedCorpus(path) as corpus:
+            blocks = list(corpus.blocks())
+        assert [x.raw for x in blocks] == [x.raw for x in expected]
+        assert ([(x.offset, x.end_offset) for x in blocks] ==
+                [(x.offset, x.end_offset) for x in expected])
+
+    def test_ranges(self, path):
+        with MappedCorpus(path) as corpus:
+            spans = list(corpus.spans())
+            for size in (1, 5, 20, 1000):
+                ranges = corpus.ranges(size)
+                assert ranges[0][0] == 0
+                assert ranges[-1][1] == len(corpus)
+                for (_, end), (start, _) in zip(ranges, ranges[1:]):
+                    assert end == start
+                found = [s for i, j in ranges for s in corpus.spans(i, j)]
+                assert found == spans
+
+    def test_pickle(self, path):
+        import pickle
+        with MappedCorpus(path) as corpus:
+            copy = pickle.loads(pickle.dumps(corpus))
+            assert list(copy.spans()) == list(corpus.spans())
+            copy.close()
+
+    def test_empty(self, tmpdir):
+        path = tmpdir.join('empty.txt')
+        path.write_binary(b'')
+        with MappedCorpus(str(path)) as corpus:
+            assert len(corpus) == 0
+            assert list(corpus.blocks()) == []
+            assert corpus.ranges(10) == []